@@ -4,17 +4,58 @@ Base Agent class that defines the interface and common functionality for all age
 All specialized agents will inherit from this class and implement their specific behavior.
 """
 
+import functools
 import json
+import logging
 import os
+import random
+import re
+import shutil
+import threading
 import time
-import uuid
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
-import re
+from typing import IO, Any, Dict, Iterator, Optional, Set, Union
+
+from utils.prompt_template import PromptTemplate, load_prompt
+
+logger = logging.getLogger(__name__)
 
-from utils.prompt_template import load_prompt
+# Standard subdirectories created under each run directory
+_RUN_SUBDIRS = ("inputs", "ir", "outputs", "traces", "logs")
+
+# Mapping from agent class names to prompt template directories
+_AGENT_PROMPT_DIRS = {
+    "SchemaParseAgent": "schema_parser",
+    "RefDataAgent": "ref_data",
+    "DataSynthAgent": "data_synth",
+}
+
+# Matches lower/upper boundaries for CamelCase -> snake_case conversion
+_CAMEL_CASE_RE = re.compile(r'([a-z])([A-Z])')
+
+
+@functools.lru_cache(maxsize=1)
+def _default_run_id() -> str:
+    """Timestamp-based run ID, computed once per process.
+    
+    Agents constructed without an explicit ``run_id`` share this value, so
+    they all write into the same run directory even if they are created in
+    different seconds.
+    """
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_load_prompt(agent_type: str, prompt_name: str) -> PromptTemplate:
+    """Load a prompt template once and reuse it for the rest of the process.
+    
+    Templates are treated as immutable during a run; call
+    ``_cached_load_prompt.cache_clear()`` to pick up edits to template files.
+    """
+    return load_prompt(agent_type, prompt_name)
 
 
 class Agent(ABC):
@@ -36,68 +77,73 @@ class Agent(ABC):
         Args:
             name: Name of the agent (used for logging and artifact directories)
             run_id: Unique identifier for the current run, used for reproducibility
-                   and artifact organization. If not provided, a timestamp-based ID is generated.
+                   and artifact organization. If not provided, a timestamp-based ID shared
+                   by all agents in the process is used.
             artifacts_dir: Root directory for storing artifacts
             seed: Seed value for LLM calls to ensure reproducibility
         """
         self.name = name
-        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_id = run_id or _default_run_id()
         self.artifacts_dir = artifacts_dir
         self.seed = seed
         
-        # Create standardized run directories
+        # Standardized run directories, created lazily on first write
         self.run_dir = Path(self.artifacts_dir) / self.run_id
-        self._create_run_directories()
+        self._init_run_directories()
         
-        # Initialize logger
-        self._setup_logging()
+        # Per-agent child of the module logger; getChild is cached by the logging manager
+        self.logger = logger.getChild(self.name)
         
-        self.logger.info(f"Initialized {self.name} agent with run_id: {self.run_id}")
+        self.logger.info("Initialized %s agent with run_id: %s", self.name, self.run_id)
     
-    def _create_run_directories(self) -> None:
-        """Create the standardized directory structure for a run."""
-        # Create main run directory
-        os.makedirs(self.run_dir, exist_ok=True)
-        
-        # Create subdirectories
-        for subdir in ["inputs", "ir", "outputs", "traces", "logs"]:
-            os.makedirs(self.run_dir / subdir, exist_ok=True)
+    def _init_run_directories(self) -> None:
+        """Set up the standardized directory structure for a run.
+        
+        Paths are computed up front, but each directory is only created the
+        first time something is written to it (see ``_ensure_dir``).
+        """
+        self._dirs = {subdir: self.run_dir / subdir for subdir in _RUN_SUBDIRS}
+        self._created_dirs: Set[str] = set()
+        self._dirty_files: Set[Path] = set()
     
-    def _setup_logging(self) -> None:
-        """Set up logging for the agent."""
-        # Placeholder for logging setup
-        # In a real implementation, this would configure a proper logger
-        self.logger = type('SimpleLogger', (), {
-            'info': lambda self, msg: print(f"[INFO] {self.name}: {msg}"),
-            'error': lambda self, msg: print(f"[ERROR] {self.name}: {msg}"),
-            'warning': lambda self, msg: print(f"[WARNING] {self.name}: {msg}"),
-        })()
-        
-        # Bind the agent name to the logger methods for convenience
-        name = self.name
-        self.logger.info = lambda msg: print(f"[INFO] {name}: {msg}")
-        self.logger.error = lambda msg: print(f"[ERROR] {name}: {msg}")
-        self.logger.warning = lambda msg: print(f"[WARNING] {name}: {msg}")
+    def _ensure_dir(self, artifact_type: str) -> Path:
+        """Return the directory for an artifact type, creating it on first use.
+        
+        Args:
+            artifact_type: Type of artifact (inputs, ir, outputs, traces, logs)
+            
+        Returns:
+            Path to the existing directory
+        """
+        path = self._dirs.get(artifact_type)
+        if path is None:
+            path = self._dirs[artifact_type] = self.run_dir / artifact_type
+        
+        if artifact_type not in self._created_dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(artifact_type)
+        
+        return path
     
     def get_inputs_dir(self) -> Path:
         """Get the inputs directory for this run."""
-        return self.run_dir / "inputs"
+        return self._ensure_dir("inputs")
     
     def get_ir_dir(self) -> Path:
         """Get the IR directory for this run."""
-        return self.run_dir / "ir"
+        return self._ensure_dir("ir")
     
     def get_outputs_dir(self) -> Path:
         """Get the outputs directory for this run."""
-        return self.run_dir / "outputs"
+        return self._ensure_dir("outputs")
     
     def get_traces_dir(self) -> Path:
         """Get the traces directory for this run."""
-        return self.run_dir / "traces"
+        return self._ensure_dir("traces")
     
     def get_logs_dir(self) -> Path:
         """Get the logs directory for this run."""
-        return self.run_dir / "logs"
+        return self._ensure_dir("logs")
     
     def save_artifact(self, name: str, content: Union[str, Dict[str, Any]], artifact_type: str = "traces", is_json: bool = False) -> Path:
         """Save an artifact to the agent's artifact directory.
@@ -111,35 +157,127 @@ class Agent(ABC):
         Returns:
             Path to the saved artifact
         """
-        artifact_dir = self.run_dir / artifact_type
+        artifact_dir = self._ensure_dir(artifact_type)
         
         if is_json:
             file_path = artifact_dir / f"{name}.json"
-            # Convert to string if it's a dict
-            if isinstance(content, dict):
-                content = json.dumps(content, indent=2, sort_keys=True)
         else:
             file_path = artifact_dir / f"{name}.md"
         
-        # Create parent directory if it doesn't exist
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        if is_json and isinstance(content, dict):
+            with self._open_artifact_file(file_path, 'w') as f:
+                # Serialize straight into the file instead of building an intermediate string
+                json.dump(content, f, indent=2, sort_keys=True)
+        else:
+            self._write_artifact_file(file_path, content.encode('utf-8'))
+        
+        self.logger.info("Saved artifact: %s", file_path)
+        return file_path
+    
+    def copy_artifact(self, name: str, source: Union[str, Path], artifact_type: str = "traces") -> Path:
+        """Copy an existing file into the agent's artifact directory.
+        
+        The file is streamed rather than read into memory, which suits large
+        outputs already written elsewhere.
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        Args:
+            name: Name of the artifact file (the source's extension is kept)
+            source: Path of the file to copy
+            artifact_type: Type of artifact (inputs, ir, outputs, traces, logs)
+            
+        Returns:
+            Path to the copied artifact
+        """
+        source = Path(source)
+        file_path = self._ensure_dir(artifact_type) / f"{name}{source.suffix}"
+        
+        tmp_path = file_path.with_name(f"{file_path.name}.{threading.get_ident()}.tmp")
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, file_path)
+        self._dirty_files.add(file_path)
         
-        self.logger.info(f"Saved artifact: {file_path}")
+        self.logger.info("Saved artifact: %s", file_path)
         return file_path
     
-    def save_prompt(self, prompt: str) -> Path:
+    def _write_artifact_file(self, file_path: Path, payload: bytes) -> None:
+        """Atomically write an encoded artifact to disk.
+        
+        Args:
+            file_path: Final path of the artifact
+            payload: UTF-8 encoded artifact content
+        """
+        # BufferedWriter passes payloads larger than its buffer straight through
+        # in a single write
+        with self._open_artifact_file(file_path, 'wb') as f:
+            f.write(payload)
+    
+    @contextmanager
+    def _open_artifact_file(self, file_path: Path, mode: str) -> Iterator[IO]:
+        """Open an artifact for writing, putting it in place when the file is closed.
+        
+        Args:
+            file_path: Final path of the artifact
+            mode: 'wb' for encoded content or 'w' for UTF-8 text
+            
+        Yields:
+            File object to write the artifact content to
+        """
+        # Write to a sibling temp file and rename it into place so readers never
+        # see a partially written artifact. The thread id keeps concurrent saves
+        # of the same artifact from sharing a temp file.
+        tmp_path = file_path.with_name(f"{file_path.name}.{threading.get_ident()}.tmp")
+        encoding = None if 'b' in mode else 'utf-8'
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, file_path)
+        
+        # Durability is deferred to flush_artifacts() so syncs are paid once per run
+        self._dirty_files.add(file_path)
+    
+    def flush_artifacts(self) -> None:
+        """Sync artifacts written since the last flush to disk.
+        
+        Each written file is fsynced once, followed by one fsync per directory
+        so the renames that put them in place are durable as well. Agents call
+        this at the end of ``run`` rather than syncing on every write.
+        """
+        if not self._dirty_files:
+            return
+        
+        dirty_dirs = set()
+        for file_path in self._dirty_files:
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            dirty_dirs.add(file_path.parent)
+        
+        for dir_path in dirty_dirs:
+            try:
+                fd = os.open(dir_path, os.O_RDONLY)
+            except OSError:
+                # Directories can't be opened for fsync on some platforms (e.g. Windows)
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        
+        self._dirty_files.clear()
+    
+    def save_prompt(self, prompt: str, identifier: str = "") -> Path:
         """Save the prompt used for LLM call to an artifact.
         
         Args:
             prompt: The prompt content
+            identifier: Optional identifier to distinguish between multiple prompts
             
         Returns:
             Path to the saved prompt file
         """
-        return self.save_artifact(f"{self.name}_prompt", prompt, artifact_type="traces")
+        name = f"{self.name}_prompt" if not identifier else f"{self.name}_prompt_{identifier}"
+        return self.save_artifact(name, prompt, artifact_type="traces")
     
     def save_llm_response(self, response: str, identifier: str = "") -> Path:
         """Save the LLM response to an artifact.
@@ -167,42 +305,59 @@ class Agent(ABC):
         content = f"# Error in {self.name}\n\n{error_message}\n\n"
         
         if error_details:
-            content += "## Details\n\n```json\n"
-            content += json.dumps(error_details, indent=2, sort_keys=True)
-            content += "\n```\n"
+            details_json = json.dumps(error_details, indent=2, sort_keys=True)
+            content = f"{content}## Details\n\n```json\n{details_json}\n```\n"
         
         return self.save_artifact(f"{self.name}_error", content, artifact_type="logs")
     
-    def handle_llm_error(self, error: Exception, retry_count: int = 3, backoff_factor: float = 2.0) -> Optional[Any]:
+    def handle_llm_error(
+        self,
+        error: Exception,
+        retry_count: int = 3,
+        backoff_factor: float = 2.0,
+        initial_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ) -> Optional[Any]:
         """Handle errors in LLM API calls with retry logic.
         
+        Retries use capped exponential backoff with jitter so that concurrent
+        callers don't hammer the API in lockstep.
+        
         Args:
             error: The exception that occurred
             retry_count: Number of retries to attempt
             backoff_factor: Multiplier for exponential backoff between retries
+            initial_delay: Base delay in seconds before the first retry
+            max_delay: Upper bound in seconds for a single backoff delay
             
         Returns:
             Result from successful retry or None if all retries failed
         """
-        self.logger.error(f"LLM API error: {str(error)}")
-        
-        if retry_count <= 0:
-            self.save_error(
-                "Maximum retries exceeded for LLM API call",
-                {"error_type": type(error).__name__, "error_message": str(error)}
-            )
-            return None
-        
-        # Exponential backoff
-        wait_time = backoff_factor ** (3 - retry_count)
-        self.logger.info(f"Retrying in {wait_time:.2f} seconds... ({retry_count} retries left)")
-        time.sleep(wait_time)
-        
-        try:
-            # This would be implemented in subclasses
-            return self.retry_llm_call()
-        except Exception as e:
-            return self.handle_llm_error(e, retry_count - 1, backoff_factor)
+        # Stringify each exception once; str() on chained exceptions isn't free
+        err_type, err_msg = type(error).__name__, str(error)
+        self.logger.error("LLM API error: %s", err_msg)
+        
+        delay = initial_delay
+        for attempt in range(retry_count):
+            # Capped exponential backoff with jitter in [0.5, 1.5)
+            wait_time = min(max_delay, delay) * (0.5 + random.random())
+            self.logger.info("Retrying in %.2f seconds... (%d retries left)", wait_time, retry_count - attempt)
+            time.sleep(wait_time)
+            
+            try:
+                # This would be implemented in subclasses
+                return self.retry_llm_call()
+            except Exception as e:
+                err_type, err_msg = type(e).__name__, str(e)
+                self.logger.error("LLM API error: %s", err_msg)
+            
+            delay *= backoff_factor
+        
+        self.save_error(
+            "Maximum retries exceeded for LLM API call",
+            {"error_type": err_type, "error_message": err_msg}
+        )
+        return None
     
     @classmethod
     def load_prompt(cls, prompt_name: str) -> str:
@@ -214,15 +369,8 @@ class Agent(ABC):
         Returns:
             Formatted prompt template
         """
-        # Dictionary mapping agent classes to directory names
-        agent_dir_map = {
-            "SchemaParseAgent": "schema_parser",
-            "RefDataAgent": "ref_data",
-            "DataSynthAgent": "data_synth"
-        }
-        
         # Get agent type from the agent name mapping or derive it
-        agent_type = agent_dir_map.get(cls.__name__)
+        agent_type = _AGENT_PROMPT_DIRS.get(cls.__name__)
         if not agent_type:
             # Fall back to automatic conversion
             agent_type = cls.__name__.lower()
@@ -230,9 +378,9 @@ class Agent(ABC):
                 agent_type = agent_type[:-5]  # Remove 'agent' suffix
                 
                 # Convert camel case to snake case (e.g., SchemaParser -> schema_parser)
-                agent_type = re.sub(r'([a-z])([A-Z])', r'\1_\2', agent_type).lower()
+                agent_type = _CAMEL_CASE_RE.sub(r'\1_\2', agent_type).lower()
         
-        template = load_prompt(agent_type, prompt_name)
+        template = _cached_load_prompt(agent_type, prompt_name)
         return template
     
     @abstractmethod
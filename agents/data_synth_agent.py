@@ -16,16 +16,257 @@ The agent uses LLM to:
 import os
 import json
 import csv
-import random
+import hashlib
+import itertools
 import re  # Import re at the top of the file
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import Callable, Dict, Generator, Iterable, Iterator, List, Optional, Any, Set, Union, Tuple
+
+import numpy as np
 
 from agents.base import Agent
 from models.ir import Schema, Table, Column, ColumnType, ReferenceData
 from utils.file_io import write_json, write_file
 from utils.llm import get_provider
 
+# Maximum number of rows requested from the LLM in a single call
+LLM_BATCH_ROWS = 20
+
+# Rough prompt budget (in tokens, estimated as chars / 4) for packing several
+# small tables into one generation prompt
+BATCH_PROMPT_TOKEN_BUDGET = 6000
+
+# Per-table section of the multi-table generation prompt
+_BATCH_TABLE_SECTION = """## [{index}] Table '{table_name}' ({row_count} rows)
+
+### Table Structure
+
+```json
+{table_info}
+```
+
+### Foreign Key Reference Data
+
+{fk_section}
+{custom_rules_section}"""
+
+# Patterns used to recover the JSON row array from LLM responses
+_JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*(\[\s*\{.*?\}\s*\])\s*```', re.DOTALL)
+_MARKDOWN_TABLE_RE = re.compile(r'\|([^|]+)\|([^|]+)\|', re.MULTILINE)
+
+_INTEGER_TYPES = frozenset({ColumnType.INTEGER, ColumnType.BIGINT, ColumnType.SMALLINT, ColumnType.TINYINT})
+_TRUE_VALUES = frozenset({'true', 't', 'yes', 'y', '1'})
+_FALSE_VALUES = frozenset({'false', 'f', 'no', 'n', '0'})
+_PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_STRING_TYPES = frozenset({ColumnType.VARCHAR, ColumnType.NVARCHAR, ColumnType.CHAR, ColumnType.NCHAR, ColumnType.TEXT})
+_ALPHABET = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+
+
+def _to_int(value: Any) -> Any:
+    """Convert a value to int, keeping the original value if it can't be converted."""
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return value
+
+
+def _to_float(value: Any) -> Any:
+    """Convert a value to float, keeping the original value if it can't be converted."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _to_bool(value: Any) -> Any:
+    """Convert common boolean spellings to bool, keeping other values as-is."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).lower()
+    if text in _TRUE_VALUES:
+        return True
+    if text in _FALSE_VALUES:
+        return False
+    return value
+
+
+def _iter_streamed_rows(chunks: Iterable[str]) -> Generator[Any, None, bool]:
+    """Yield the elements of a streamed JSON array as soon as each one is complete.
+    
+    Text before the opening bracket (such as a code fence) is skipped. Iteration
+    stops at the closing bracket or at the first element that can't be decoded
+    once the stream has ended.
+    
+    Args:
+        chunks: Consecutive pieces of the response text
+        
+    Yields:
+        Decoded array elements
+        
+    Returns:
+        True if the closing bracket was reached, False if decoding stopped early
+        (malformed element or truncated response)
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        if not started:
+            start = buffer.find('[')
+            if start < 0:
+                continue
+            buffer = buffer[start + 1:]
+            started = True
+        
+        while True:
+            pos = 0
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return True
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Incomplete element; wait for more of the stream
+                buffer = buffer[pos:]
+                break
+            yield element
+            buffer = buffer[end:]
+    return False
+
+
+def _find_cycle(start: str, deps: Dict[str, List[str]], pending: Set[str]) -> List[str]:
+    """Find a dependency cycle by following unmet dependencies from a table.
+    
+    Args:
+        start: Table to start from; it and every table reached must have at least
+            one dependency in pending
+        deps: Dependencies of each table
+        pending: Tables not generated yet
+        
+    Returns:
+        Table names on the cycle, in the order they were reached
+    """
+    path: List[str] = []
+    positions: Dict[str, int] = {}
+    table_name = start
+    while table_name not in positions:
+        positions[table_name] = len(path)
+        path.append(table_name)
+        table_name = next(dep for dep in deps[table_name] if dep in pending)
+    return path[positions[table_name]:]
+
+
+def _decode_streamed_rows(chunks: Iterable[str]) -> Tuple[List[Any], bool]:
+    """Decode a streamed JSON array with _iter_streamed_rows.
+    
+    Args:
+        chunks: Consecutive pieces of the response text
+        
+    Returns:
+        Tuple of (decoded elements, whether the whole array was decoded)
+    """
+    rows: List[Any] = []
+    iterator = _iter_streamed_rows(chunks)
+    while True:
+        try:
+            rows.append(next(iterator))
+        except StopIteration as stop:
+            return rows, stop.value
+
+
+def _repair_json_array(text: str) -> Optional[str]:
+    """Extract the first JSON array from LLM output, fixing common mistakes on the way.
+    
+    A single scan tracks bracket depth outside strings to find the end of the
+    array, while converting single-quoted strings to double-quoted ones, quoting
+    bare object keys, mapping Python literals (True, False, None) to JSON and
+    dropping trailing commas.
+    
+    Args:
+        text: LLM response text
+        
+    Returns:
+        Repaired array text, or None if no complete array was found
+    """
+    start = text.find('[')
+    if start < 0:
+        return None
+    
+    out: List[str] = []
+    depth = 0
+    quote = None
+    i, n = start, len(text)
+    while i < n:
+        ch = text[i]
+        if quote:
+            if ch == '\\' and i + 1 < n:
+                # \' isn't a valid JSON escape; other escapes pass through
+                out.append("'" if text[i + 1] == "'" else text[i:i + 2])
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            else:
+                out.append('\\"' if ch == '"' else ch)
+        elif ch in '"\'':
+            out.append('"')
+            quote = ch
+        elif ch in '[{':
+            out.append(ch)
+            depth += 1
+        elif ch in ']}':
+            # Drop a trailing comma before the closing bracket
+            k = len(out) - 1
+            while k >= 0 and out[k].isspace():
+                k -= 1
+            if k >= 0 and out[k] == ',':
+                del out[k]
+            out.append(ch)
+            depth -= 1
+            if depth == 0:
+                return "".join(out)
+        elif ch.isalpha() or ch == '_':
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == '_'):
+                j += 1
+            word = text[i:j]
+            k = j
+            while k < n and text[k].isspace():
+                k += 1
+            if k < n and text[k] == ':':
+                out.append(f'"{word}"')
+            else:
+                out.append(_PYTHON_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return None
+
+
+def _make_converter(column: Column) -> Callable[[Any], Any]:
+    """Pick the function that converts LLM output values for a column.
+    
+    Args:
+        column: Column definition
+        
+    Returns:
+        Converter for non-null values of the column
+    """
+    if column.is_numeric:
+        return _to_int if column.data_type in _INTEGER_TYPES else _to_float
+    if column.is_boolean:
+        return _to_bool
+    # String, date, etc. - keep as string
+    return str
+
 
 class DataSynthAgent(Agent):
     """
@@ -42,7 +283,9 @@ class DataSynthAgent(Agent):
         Args:
             run_id: Unique identifier for this run
             artifacts_dir: Directory for storing artifacts
-            **kwargs: Additional parameters
+            **kwargs: Additional parameters (seed, llm_provider, llm_model,
+                parallelism, the maximum number of tables generated concurrently, and
+                llm_cache, whether seeded runs reuse LLM responses cached on disk)
         """
         super().__init__(
             name="DataSynthAgent",
@@ -54,17 +297,40 @@ class DataSynthAgent(Agent):
         self.llm_model = kwargs.get("llm_model", "gpt-4o")
         self.provider = get_provider(self.llm_provider)
         
-        # Set random seed for reproducible data generation
-        if self.seed is not None:
-            random.seed(self.seed)
+        # Maximum number of tables generated concurrently within a dependency wave
+        self.parallelism = kwargs.get("parallelism", 8)
+        
+        # Responses are cached across runs under artifacts_dir/llm_cache. Only seeded
+        # runs use the cache, so unseeded runs still get fresh data.
+        self.llm_cache = kwargs.get("llm_cache", True)
+        self._request_counts: Dict[str, int] = {}
+        self._request_counts_lock = threading.Lock()
+        
+        # Per-table random generators are derived from the seed (see _table_rng)
+        self._rng_calls: Dict[str, int] = {}
+        self._rng_calls_lock = threading.Lock()
         
-        # Store the last LLM call for retry logic
-        self._last_prompt = None
-        self._last_params = None
+        # Case-insensitive table lookup for the schema being generated, built in run()
+        self._table_index: Dict[str, Table] = {}
+        
+        # Prompt fragments serialized once per run: table JSON by table name, and
+        # (sample JSON, has weights) by referenced table name
+        self._table_json_cache: Dict[str, str] = {}
+        self._fk_sample_cache: Dict[str, Tuple[str, bool]] = {}
+        
+        # Foreign key candidate values and probabilities by (referenced table, columns)
+        self._fk_candidate_cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[List[List[Any]], Optional[np.ndarray]]] = {}
+        
+        # Store the last LLM call for retry logic, per thread since tables are
+        # generated concurrently
+        self._local = threading.local()
     
     def llm_call(self, prompt: str, **kwargs) -> str:
         """Make an LLM API call.
         
+        A fresh response is only written to the LLM cache once the caller has
+        parsed it and calls _commit_cached_response.
+        
         Args:
             prompt: The prompt to send to the LLM
             **kwargs: Additional parameters for the LLM API call
@@ -72,30 +338,158 @@ class DataSynthAgent(Agent):
         Returns:
             Response from the LLM
         """
-        self._last_prompt = prompt
-        self._last_params = kwargs
+        self._local.last_prompt = prompt
+        self._local.last_params = kwargs
+        
+        # The cache key advances once per request here, so retries reuse it
+        self._local.last_cache_path = self._llm_cache_path(
+            prompt, kwargs.get("temperature", 0.2), kwargs.get("max_tokens", 4000)
+        )
+        return self._generate_response(prompt, self._local.last_cache_path, **kwargs)
+    
+    def _generate_response(self, prompt: str, cache_path: Optional[Path], **kwargs) -> str:
+        """Get a response from the LLM cache or the provider.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            cache_path: Path from _llm_cache_path, or None if the request isn't cacheable
+            **kwargs: Additional parameters for the LLM API call
+            
+        Returns:
+            Response from the LLM
+        """
+        temperature = kwargs.get("temperature", 0.2)  # Some creativity is good for data variety
+        max_tokens = kwargs.get("max_tokens", 4000)
+        self._local.pending_cache = None
+        if cache_path and cache_path.exists():
+            return cache_path.read_text(encoding='utf-8')
+        
+        response = self.provider.generate(
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            seed=self.seed,
+            model=self.llm_model
+        )
+        
+        if cache_path:
+            self._local.pending_cache = (cache_path, response)
+        return response
+    
+    def llm_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Make a streaming LLM API call.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            **kwargs: Additional parameters for the LLM API call
+            
+        Returns:
+            Iterator over pieces of the LLM response; as with llm_call, a fresh
+            response is only cached by _commit_cached_response
+        """
+        self._local.last_prompt = prompt
+        self._local.last_params = kwargs
+        
+        temperature = kwargs.get("temperature", 0.2)
+        max_tokens = kwargs.get("max_tokens", 4000)
+        cache_path = self._local.last_cache_path = self._llm_cache_path(prompt, temperature, max_tokens)
+        self._local.pending_cache = None
+        if cache_path and cache_path.exists():
+            return iter([cache_path.read_text(encoding='utf-8')])
         
-        return self.provider.generate(
+        stream = self.provider.generate_stream(
             prompt=prompt,
-            temperature=kwargs.get("temperature", 0.2),  # Some creativity is good for data variety
-            max_tokens=kwargs.get("max_tokens", 4000),
+            temperature=temperature,
+            max_tokens=max_tokens,
             seed=self.seed,
             model=self.llm_model
         )
+        return self._cache_stream(stream, cache_path) if cache_path else stream
+    
+    def _llm_cache_path(self, prompt: str, temperature: float, max_tokens: int) -> Optional[Path]:
+        """Get the cache file for an LLM request.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            temperature: Sampling temperature of the request
+            max_tokens: Maximum tokens of the request
+            
+        Returns:
+            Path of the cached response, or None if the request isn't cacheable
+        """
+        if not self.llm_cache or self.seed is None:
+            return None
+        
+        key = "\0".join([
+            self.llm_provider, self.llm_model, str(self.seed), str(temperature), str(max_tokens), prompt
+        ])
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        
+        # Repeats of a request within a run (e.g. successive row batches of one table)
+        # get their own entries, so they don't all replay the first response. Only
+        # llm_call and llm_stream get a path here; retries reuse theirs.
+        with self._request_counts_lock:
+            occurrence = self._request_counts.get(digest, 0)
+            self._request_counts[digest] = occurrence + 1
+        if occurrence:
+            digest = f"{digest}-{occurrence}"
+        return Path(self.artifacts_dir) / "llm_cache" / f"{digest}.txt"
+    
+    def _store_cached_response(self, cache_path: Path, response: str) -> None:
+        """Atomically write an LLM response to the cache.
+        
+        Args:
+            cache_path: Path from _llm_cache_path
+            response: Complete LLM response
+        """
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(response, encoding='utf-8')
+        os.replace(tmp_path, cache_path)
+    
+    def _cache_stream(self, stream: Iterator[str], cache_path: Path) -> Iterator[str]:
+        """Pass a response stream through, keeping the response for the cache once complete.
+        
+        Args:
+            stream: Response chunks from the provider
+            cache_path: Path from _llm_cache_path
+            
+        Yields:
+            The chunks of the stream, unchanged
+        """
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        self._local.pending_cache = (cache_path, "".join(chunks))
+    
+    def _commit_cached_response(self) -> None:
+        """Cache the last fresh LLM response of this thread.
+        
+        Called once the response has been parsed, so responses that only produce
+        fallback data are requested again on the next run instead of replayed.
+        """
+        pending = getattr(self._local, "pending_cache", None)
+        if pending:
+            self._local.pending_cache = None
+            self._store_cached_response(*pending)
     
     def retry_llm_call(self) -> str:
         """Retry the last LLM API call.
         
+        The retry uses the same LLM cache entry as the call it repeats.
+        
         Returns:
             Response from the LLM
         
         Raises:
             RuntimeError: If there's no previous LLM call to retry
         """
-        if self._last_prompt is None:
+        last_prompt = getattr(self._local, "last_prompt", None)
+        if last_prompt is None:
             raise RuntimeError("No previous LLM call to retry")
         
-        return self.llm_call(self._last_prompt, **self._last_params)
+        return self._generate_response(last_prompt, self._local.last_cache_path, **self._local.last_params)
     
     def run(self, 
             schema: Schema, 
@@ -118,6 +512,11 @@ class DataSynthAgent(Agent):
         # Save input schema for reference
         self.save_artifact("input_schema", schema.to_json(indent=2), is_json=True)
         
+        self._table_index = {table.name.lower(): table for table in schema.tables}
+        self._table_json_cache = {}
+        self._fk_sample_cache = {}
+        self._fk_candidate_cache = {}
+        
         # Create output directory
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
@@ -131,18 +530,44 @@ class DataSynthAgent(Agent):
                              for table in [t.name for t in schema.tables]])
         self.logger.info(f"Will generate data for tables:\n{tables_info}")
         
-        # Generate data for each table in the correct order (respecting foreign key constraints)
+        # Generate data for each table in the correct order (respecting foreign key constraints).
+        # Tables within a wave don't depend on each other, so their LLM calls run concurrently.
         output_files = {}
         generation_order = self._determine_generation_order(schema)
+        waves = self._determine_generation_waves(schema, generation_order)
         
-        for table_name in generation_order:
-            table = schema.get_table(table_name)
-            if table:
-                output_file = self._generate_table_data(
-                    schema, table, row_counts.get(table_name, 10), output_path, custom_rules
+        with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+            for wave in waves:
+                tables = [self._get_table(schema, table_name) for table_name in wave]
+                singles, batches = self._plan_wave(
+                    schema, [table for table in tables if table], row_counts, custom_rules
                 )
-                output_files[table_name] = output_file
+                
+                single_futures = {
+                    table.name: executor.submit(
+                        self._generate_table_data,
+                        schema, table, row_counts.get(table.name, 10), output_path, custom_rules
+                    )
+                    for table in singles
+                }
+                batch_futures = [
+                    executor.submit(
+                        self._generate_table_batch,
+                        schema, batch, row_counts, output_path, custom_rules
+                    )
+                    for batch in batches
+                ]
+                
+                # Finish the whole wave before starting tables that depend on it
+                wave_files = {name: future.result() for name, future in single_futures.items()}
+                for future in batch_futures:
+                    wave_files.update(future.result())
+                
+                for table_name in wave:
+                    if table_name in wave_files:
+                        output_files[table_name] = wave_files[table_name]
         
+        self.flush_artifacts()
         return output_files
     
     def _default_row_counts(self, schema: Schema) -> Dict[str, int]:
@@ -181,12 +606,26 @@ class DataSynthAgent(Agent):
         
         return row_counts
     
+    def _get_table(self, schema: Schema, name: str) -> Optional[Table]:
+        """Look up a table by name, using the index built in ``run``.
+        
+        Args:
+            schema: Schema to search if the table isn't indexed
+            name: Table name (case-insensitive)
+            
+        Returns:
+            Table object or None if not found
+        """
+        table = self._table_index.get(name.lower())
+        return table if table is not None else schema.get_table(name)
+    
     def _determine_generation_order(self, schema: Schema) -> List[str]:
         """Determine the order in which tables should be generated.
         
         Tables with foreign key dependencies must be generated after the tables they
         reference. Reference tables are generated first, followed by data tables in
-        dependency order.
+        dependency order. A circular dependency is broken at the table with the
+        fewest unmet dependencies, and the tables that depend on it follow in order.
         
         Args:
             schema: Schema with tables and relationships
@@ -200,42 +639,89 @@ class DataSynthAgent(Agent):
         # Then add other tables in dependency order
         data_tables = [table.name for table in schema.get_data_tables()]
         
-        # Build dependency graph
-        dependencies = {table.name: set() for table in schema.tables}
-        for table in schema.tables:
-            for fk in table.foreign_keys:
-                dependencies[table.name].add(fk.ref_table)
-        
-        # Topological sort
-        visited = set(ref_tables)  # Mark reference tables as already visited
+        # Build dependency graph between data tables; references to reference tables,
+        # unknown tables and the table itself are already satisfied
+        pending = set(data_tables)
+        in_degree = {table_name: 0 for table_name in data_tables}
+        deps: Dict[str, List[str]] = {table_name: [] for table_name in data_tables}
+        rev_deps: Dict[str, List[str]] = {table_name: [] for table_name in data_tables}
+        for table in schema.get_data_tables():
+            # Deduplicated in foreign key order, so cycles are broken the same way every run
+            for dep in dict.fromkeys(fk.ref_table for fk in table.foreign_keys):
+                if dep in pending and dep != table.name:
+                    in_degree[table.name] += 1
+                    deps[table.name].append(dep)
+                    rev_deps[dep].append(table.name)
+        
+        # Topological sort (Kahn's algorithm)
         generation_order = ref_tables.copy()
-        
-        def visit(table_name):
-            if table_name in visited:
-                return
-            if table_name in temp_visited:
-                # Circular dependency, break it (could be more sophisticated)
-                return
-            
-            temp_visited.add(table_name)
-            
-            # Visit dependencies first
-            for dep in dependencies.get(table_name, set()):
-                visit(dep)
+        queue = deque(table_name for table_name in data_tables if in_degree[table_name] == 0)
+        while pending:
+            if not queue:
+                # Circular dependency. Every remaining table still waits on another one,
+                # so following unmet dependencies from any of them reaches a cycle;
+                # break it at the member with the fewest unmet dependencies.
+                start = next(name for name in data_tables if name in pending)
+                cycle = _find_cycle(start, deps, pending)
+                table_name = min(cycle, key=lambda name: (in_degree[name], data_tables.index(name)))
+                self.logger.warning(
+                    f"Circular foreign key dependency, generating '{table_name}' before "
+                    f"{in_degree[table_name]} of the tables it references"
+                )
+                queue.append(table_name)
             
-            temp_visited.remove(table_name)
-            visited.add(table_name)
+            table_name = queue.popleft()
+            pending.discard(table_name)
             generation_order.append(table_name)
-        
-        # Process all data tables
-        temp_visited = set()
-        for table_name in data_tables:
-            if table_name not in visited:
-                visit(table_name)
+            for dependent in rev_deps[table_name]:
+                in_degree[dependent] -= 1
+                # A table picked to break a cycle may reach zero after it was generated
+                if in_degree[dependent] == 0 and dependent in pending:
+                    queue.append(dependent)
         
         self.logger.info(f"Generation order: {', '.join(generation_order)}")
         return generation_order
     
+    def _determine_generation_waves(self, schema: Schema, generation_order: List[str]) -> List[List[str]]:
+        """Group the generation order into waves of mutually independent tables.
+        
+        A table is placed one wave after the latest wave containing a table it
+        references. Reference tables always go in the first wave, and
+        references that would close a cycle are ignored, matching
+        ``_determine_generation_order``.
+        
+        Args:
+            schema: Schema with tables and relationships
+            generation_order: Table names in dependency order
+            
+        Returns:
+            List of waves, each a list of table names in generation order
+        """
+        reference_tables = {table.name for table in schema.get_reference_tables()}
+        dependencies = {
+            table.name: {fk.ref_table for fk in table.foreign_keys}
+            for table in schema.tables
+        }
+        
+        levels: Dict[str, int] = {}
+        waves: List[List[str]] = []
+        for table_name in generation_order:
+            if table_name in reference_tables:
+                level = 0
+            else:
+                # Only dependencies already placed count; the rest are cycles or unknown tables
+                level = 1 + max(
+                    (levels[dep] for dep in dependencies.get(table_name, ()) if dep in levels),
+                    default=-1
+                )
+            levels[table_name] = level
+            
+            if level == len(waves):
+                waves.append([])
+            waves[level].append(table_name)
+        
+        return waves
+    
     def _generate_table_data(self, 
                            schema: Schema, 
                            table: Table, 
@@ -263,15 +749,119 @@ class DataSynthAgent(Agent):
             # For regular tables, generate synthetic data
             data = self._generate_synthetic_data(schema, table, row_count, custom_rules)
         
+        return self._save_table_data(table, data, output_dir)
+    
+    def _save_table_data(self, table: Table, data: List[Dict[str, Any]], output_dir: Path) -> Path:
+        """Write generated rows for a table to its CSV output and trace artifact.
+        
+        Args:
+            table: Table the data belongs to
+            data: Generated rows
+            output_dir: Directory to save the generated data
+            
+        Returns:
+            Path to the generated CSV file
+        """
         # Save to CSV
         output_file = output_dir / f"{table.name}.csv"
         self._write_csv(data, output_file)
         
         # Save a copy to artifacts
-        self.save_artifact(f"data_{table.name}", "\n".join([",".join(map(str, row.values())) for row in data]))
+        self.copy_artifact(f"data_{table.name}", output_file)
         
         return output_file
     
+    def _plan_wave(self,
+                   schema: Schema,
+                   tables: List[Table],
+                   row_counts: Dict[str, int],
+                   custom_rules: Optional[Dict[str, Any]] = None) -> Tuple[List[Table], List[List[Table]]]:
+        """Split a wave into tables generated on their own and batches of small tables.
+        
+        Tables that need at most one LLM call are packed greedily into shared
+        prompts, as long as a batch stays within ``LLM_BATCH_ROWS`` rows in total
+        and within ``BATCH_PROMPT_TOKEN_BUDGET`` estimated prompt tokens.
+        
+        Args:
+            schema: Complete schema
+            tables: Tables in the wave, in generation order
+            row_counts: Dictionary mapping table names to row counts
+            custom_rules: Optional custom generation rules
+            
+        Returns:
+            Tuple of (tables to generate individually, batches of tables to generate together)
+        """
+        singles = []
+        candidates = []
+        for table in tables:
+            row_count = row_counts.get(table.name, 10)
+            uses_reference_data = ((table.is_reference_table and table.reference_data
+                                    and table.reference_data.rows)
+                                   or self._is_reference_sampled(schema, table))
+            if uses_reference_data or row_count > LLM_BATCH_ROWS:
+                singles.append(table)
+            else:
+                candidates.append(table)
+        
+        batches = []
+        current, current_rows, current_tokens = [], 0, 0
+        for table in candidates:
+            row_count = row_counts.get(table.name, 10)
+            tokens = len(self._create_batch_table_section(schema, table, 0, row_count, custom_rules)) // 4
+            if current and (current_rows + row_count > LLM_BATCH_ROWS
+                            or current_tokens + tokens > BATCH_PROMPT_TOKEN_BUDGET):
+                batches.append(current)
+                current, current_rows, current_tokens = [], 0, 0
+            current.append(table)
+            current_rows += row_count
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        
+        # A batch of one is just a regular single-table call
+        for batch in [batch for batch in batches if len(batch) == 1]:
+            batches.remove(batch)
+            singles.append(batch[0])
+        
+        return singles, batches
+    
+    def _generate_table_batch(self,
+                              schema: Schema,
+                              tables: List[Table],
+                              row_counts: Dict[str, int],
+                              output_dir: Path,
+                              custom_rules: Optional[Dict[str, Any]] = None) -> Dict[str, Path]:
+        """Generate data for several small tables with a single LLM call.
+        
+        Tables missing from the LLM response are generated individually instead.
+        
+        Args:
+            schema: Complete schema
+            tables: Tables to generate data for
+            row_counts: Dictionary mapping table names to row counts
+            output_dir: Directory to save the generated data
+            custom_rules: Optional custom generation rules
+            
+        Returns:
+            Dictionary mapping table names to output file paths
+        """
+        self.logger.info(f"Generating tables {', '.join(t.name for t in tables)} in a single batch")
+        
+        generated = self._llm_generate_batch(schema, tables, row_counts, custom_rules)
+        
+        output_files = {}
+        for table in tables:
+            data = generated.get(table.name)
+            if data:
+                output_files[table.name] = self._save_table_data(table, data, output_dir)
+            else:
+                self.logger.warning(f"Batch response had no rows for table '{table.name}', generating it separately")
+                output_files[table.name] = self._generate_table_data(
+                    schema, table, row_counts.get(table.name, 10), output_dir, custom_rules
+                )
+        
+        return output_files
+    
     def _use_reference_data(self, table: Table, row_count: int) -> List[Dict[str, Any]]:
         """Use existing reference data for the table.
         
@@ -316,8 +906,13 @@ class DataSynthAgent(Agent):
         Returns:
             List of dictionaries representing the rows
         """
+        # Tables made only of foreign keys into reference data are sampled directly
+        if self._is_reference_sampled(schema, table):
+            self.logger.info(f"Sampling table '{table.name}' from reference data without the LLM")
+            return self._algorithmic_generate_data(schema, table, row_count, [])
+        
         # Determine batch size for LLM generation
-        batch_size = 20  # LLM batch size for efficient generation
+        batch_size = LLM_BATCH_ROWS
         
         # For small tables (≤50 rows), use a single LLM call
         if row_count <= batch_size:
@@ -357,6 +952,29 @@ class DataSynthAgent(Agent):
         
         return all_rows
     
+    def _is_reference_sampled(self, schema: Schema, table: Table) -> bool:
+        """Check whether every column of a table is a foreign key into reference data.
+        
+        Such tables (typically junction tables) can be generated by sampling the
+        referenced rows, without asking the LLM.
+        
+        Args:
+            schema: Complete schema
+            table: Table to check
+            
+        Returns:
+            True if all columns can be filled from reference data
+        """
+        fk_columns = {col.lower() for fk in table.foreign_keys for col in fk.columns}
+        if not table.columns or any(column.name.lower() not in fk_columns for column in table.columns):
+            return False
+        
+        for fk in table.foreign_keys:
+            ref_table = self._get_table(schema, fk.ref_table)
+            if not (ref_table and ref_table.reference_data and ref_table.reference_data.rows):
+                return False
+        return True
+    
     def _llm_generate_data(self, 
                          schema: Schema, 
                          table: Table, 
@@ -377,15 +995,31 @@ class DataSynthAgent(Agent):
         prompt = self._create_generation_prompt(schema, table, row_count, custom_rules)
         
         # Save the prompt for reference
-        self.save_prompt(prompt)
+        self.save_prompt(prompt, identifier=table.name)
         
-        # Call LLM to generate data
+        # Call LLM to generate data, decoding rows while the response is still streaming
         try:
-            response = self.llm_call(prompt, temperature=0.3)  # More variety for synthetic data
+            chunks: List[str] = []
+            stream = self.llm_stream(prompt, temperature=0.3)  # More variety for synthetic data
+            rows, complete = _decode_streamed_rows(chunks.append(c) or c for c in stream)
+            # Drain anything after the array so the saved response is complete
+            chunks.extend(stream)
+            response = "".join(chunks)
             self.save_artifact(f"llm_response_{table.name}", response)
             
-            # Parse the LLM response to get the data
-            rows = self._parse_generated_data(response, table)
+            # Only trust the streamed rows if the whole array decoded; otherwise a
+            # malformed element would silently drop every row after it
+            rows = [row for row in rows if isinstance(row, dict)]
+            if complete and rows:
+                rows = self._convert_data_types(rows, table)
+            else:
+                # Parse the full LLM response, with the lenient repairs
+                rows = self._parse_generated_data(response, table)
+                if rows is None:
+                    # Don't cache a response that only produces fallback data
+                    return self._generate_fallback_data(table, 10)
+            
+            self._commit_cached_response()
             return rows
         except Exception as e:
             self.logger.error(f"Error generating data for table '{table.name}': {str(e)}")
@@ -414,48 +1048,180 @@ class DataSynthAgent(Agent):
         Returns:
             Prompt string for the LLM
         """
+        table_info, fk_section, rules_str = self._build_table_context(schema, table, custom_rules)
+        
+        # Add custom rules section if provided
+        custom_rules_section = ""
+        if rules_str:
+            custom_rules_section = f"\n## Custom Generation Rules\n```json\n{rules_str}\n```\n"
+        
+        # Load and format the prompt template
+        prompt_template = self.load_prompt("generate_data")
+        prompt = prompt_template.format(
+            row_count=row_count,
+            table_name=table.name,
+            table_info=table_info,
+            fk_section=fk_section,
+            custom_rules_section=custom_rules_section
+        )
+        
+        return prompt
+    
+    def _build_table_context(self,
+                             schema: Schema,
+                             table: Table,
+                             custom_rules: Optional[Dict[str, Any]] = None) -> Tuple[str, str, Optional[str]]:
+        """Build the table-specific parts of a generation prompt.
+        
+        Args:
+            schema: Complete schema
+            table: Table to generate data for
+            custom_rules: Optional custom generation rules
+            
+        Returns:
+            Tuple of (table JSON, foreign key section, custom rules JSON or None)
+        """
         # Build information about the table
-        table_info = json.dumps(table.to_dict(), indent=2)
+        table_info = self._table_json_cache.get(table.name)
+        if table_info is None:
+            table_info = self._table_json_cache[table.name] = json.dumps(table.to_dict(), indent=2)
         
         # Get information about foreign key references
         fk_references = []
         for fk in table.foreign_keys:
-            ref_table = schema.get_table(fk.ref_table)
+            ref_table = self._get_table(schema, fk.ref_table)
             if ref_table and ref_table.reference_data and ref_table.reference_data.rows:
-                # Include a sample of reference data (up to 10 rows)
-                sample_rows = ref_table.reference_data.rows[:10]
-                # Include distribution weights if available
-                has_weights = any("weight" in row for row in sample_rows)
+                cached = self._fk_sample_cache.get(ref_table.name)
+                if cached is None:
+                    # Include a sample of reference data (up to 10 rows)
+                    sample_rows = ref_table.reference_data.rows[:10]
+                    # Include distribution weights if available
+                    has_weights = any("weight" in row for row in sample_rows)
+                    cached = self._fk_sample_cache[ref_table.name] = (json.dumps(sample_rows, indent=2), has_weights)
+                sample_json, has_weights = cached
                 
                 fk_references.append(
                     f"Foreign key {fk.name} references table {fk.ref_table}:\n"
                     f"Columns: {', '.join(fk.columns)} -> {', '.join(fk.ref_columns)}\n"
                     f"Reference data sample ({len(ref_table.reference_data.rows)} total rows)"
                     f"{' with distribution weights' if has_weights else ''}:\n"
-                    f"{json.dumps(sample_rows, indent=2)}"
+                    f"{sample_json}"
                 )
         
         fk_section = "\n\n".join(fk_references) if fk_references else "No foreign key references with reference data."
         
-        # Add custom rules section if provided
-        custom_rules_section = ""
+        rules_str = None
         if custom_rules and table.name in custom_rules:
             rules_str = json.dumps(custom_rules[table.name], indent=2)
-            custom_rules_section = f"\n## Custom Generation Rules\n```json\n{rules_str}\n```\n"
         
-        # Load and format the prompt template
-        prompt_template = self.load_prompt("generate_data")
-        prompt = prompt_template.format(
-            row_count=row_count,
+        return table_info, fk_section, rules_str
+    
+    def _create_batch_table_section(self,
+                                    schema: Schema,
+                                    table: Table,
+                                    index: int,
+                                    row_count: int,
+                                    custom_rules: Optional[Dict[str, Any]] = None) -> str:
+        """Create one table's section of a multi-table generation prompt.
+        
+        Args:
+            schema: Complete schema
+            table: Table to generate data for
+            index: Position identifier of the table within the batch
+            row_count: Number of rows to generate
+            custom_rules: Optional custom generation rules
+            
+        Returns:
+            Prompt section for the table
+        """
+        table_info, fk_section, rules_str = self._build_table_context(schema, table, custom_rules)
+        
+        custom_rules_section = ""
+        if rules_str:
+            custom_rules_section = f"\n### Custom Generation Rules\n\n```json\n{rules_str}\n```\n"
+        
+        return _BATCH_TABLE_SECTION.format(
+            index=index,
             table_name=table.name,
+            row_count=row_count,
             table_info=table_info,
             fk_section=fk_section,
             custom_rules_section=custom_rules_section
         )
+    
+    def _llm_generate_batch(self,
+                            schema: Schema,
+                            tables: List[Table],
+                            row_counts: Dict[str, int],
+                            custom_rules: Optional[Dict[str, Any]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Use a single LLM call to generate data for several tables.
         
-        return prompt
+        Args:
+            schema: Complete schema
+            tables: Tables to generate data for
+            row_counts: Dictionary mapping table names to row counts
+            custom_rules: Optional custom generation rules
+            
+        Returns:
+            Dictionary mapping table names to generated rows; tables the LLM
+            didn't return are omitted
+        """
+        sections = [
+            self._create_batch_table_section(
+                schema, table, i, row_counts.get(table.name, 10), custom_rules
+            )
+            for i, table in enumerate(tables, start=1)
+        ]
+        prompt_template = self.load_prompt("generate_data_batch")
+        prompt = prompt_template.format(
+            table_count=len(tables),
+            table_sections="\n".join(sections)
+        )
+        
+        self.save_prompt(prompt, identifier=f"batch_{tables[0].name}")
+        
+        try:
+            response = self.llm_call(prompt, temperature=0.3)
+            self.save_artifact(f"llm_response_batch_{tables[0].name}", response)
+            generated = self._parse_generated_batch(response, tables)
+            if generated:
+                self._commit_cached_response()
+            return generated
+        except Exception as e:
+            self.logger.error(f"Error generating batch data for tables {', '.join(t.name for t in tables)}: {str(e)}")
+            return {}
+    
+    def _parse_generated_batch(self, response: str, tables: List[Table]) -> Dict[str, List[Dict[str, Any]]]:
+        """Parse a multi-table LLM response into per-table rows.
+        
+        Args:
+            response: LLM response text
+            tables: Tables that were requested
+            
+        Returns:
+            Dictionary mapping table names to typed rows
+        """
+        json_start = response.find('{')
+        json_end = response.rfind('}') + 1
+        if json_start == -1 or json_end == 0:
+            raise ValueError("No JSON object found in batch response")
+        
+        data = json.loads(response[json_start:json_end])
+        if not isinstance(data, dict):
+            raise ValueError("Parsed batch JSON is not an object")
+        
+        # Match table names case-insensitively, as Schema.get_table does
+        by_name = {name.lower(): rows for name, rows in data.items()}
+        
+        result = {}
+        for table in tables:
+            rows = by_name.get(table.name.lower())
+            if isinstance(rows, list) and all(isinstance(row, dict) for row in rows):
+                result[table.name] = self._convert_data_types(rows, table)
+        
+        return result
     
-    def _parse_generated_data(self, response: str, table: Table) -> List[Dict[str, Any]]:
+    def _parse_generated_data(self, response: str, table: Table) -> Optional[List[Dict[str, Any]]]:
         """Parse the LLM response to extract the generated data.
         
         Args:
@@ -463,12 +1229,13 @@ class DataSynthAgent(Agent):
             table: Table structure for type conversion
             
         Returns:
-            List of dictionaries representing the rows
+            List of dictionaries representing the rows, or None if the response
+            can't be parsed
         """
         try:
             # Extract JSON array from the response
             # First, look for JSON code blocks
-            json_match = re.search(r'```(?:json)?\s*(\[\s*\{.*?\}\s*\])\s*```', response, re.DOTALL)
+            json_match = _JSON_BLOCK_RE.search(response)
             if json_match:
                 json_str = json_match.group(1)
             else:
@@ -482,13 +1249,7 @@ class DataSynthAgent(Agent):
                     if start >= 0 and end > start:
                         json_str = json_str[start:end]
                     else:
-                        # More aggressive attempt to find a JSON array
-                        pattern = r'\[\s*\{[^\[\]]*\}\s*(?:,\s*\{[^\[\]]*\}\s*)*\]'
-                        match = re.search(pattern, json_str, re.DOTALL)
-                        if match:
-                            json_str = match.group(0)
-                        else:
-                            raise ValueError("No JSON array found in response")
+                        raise ValueError("No JSON array found in response")
         
             # Parse the JSON
             data = json.loads(json_str)
@@ -503,31 +1264,20 @@ class DataSynthAgent(Agent):
         except Exception as e:
             self.logger.error(f"Error parsing generated data: {str(e)}")
             
-            # Attempt 1: Try to find any JSON array with more flexible regex
-            try:
-                array_pattern = r'\[(.*?)\]'
-                matches = re.findall(array_pattern, response, re.DOTALL)
-                if matches:
-                    # Find the largest match (likely the main data array)
-                    largest_match = max(matches, key=len)
-                    if largest_match.strip().startswith('{'):
-                        # Fix common JSON issues
-                        array_str = f"[{largest_match}]"
-                        # Replace single quotes with double quotes
-                        array_str = array_str.replace("'", '"')
-                        # Fix unquoted keys
-                        array_str = re.sub(r'(\w+):', r'"\1":', array_str)
-                        
-                        data = json.loads(array_str)
+            # Attempt 1: Fix common JSON issues in a single cleanup pass and parse again
+            array_str = _repair_json_array(response)
+            if array_str:
+                try:
+                    data = json.loads(array_str)
+                    if isinstance(data, list):
                         return self._convert_data_types(data, table)
-            except:
-                pass
+                except ValueError:
+                    pass
                 
             # Attempt 2: Try to generate a structured array from table format  
             try:
                 # Look for tabular data with | separators
-                table_pattern = r'\|([^|]+)\|([^|]+)\|'
-                table_matches = re.findall(table_pattern, response, re.MULTILINE)
+                table_matches = _MARKDOWN_TABLE_RE.findall(response)
                 
                 if table_matches and len(table_matches) > 1:
                     # First row might be headers
@@ -544,9 +1294,8 @@ class DataSynthAgent(Agent):
                     return self._convert_data_types(rows, table)
             except:
                 pass
-                
-            # Attempt 3: Generate sample data based on table structure if everything else fails
-            return self._generate_fallback_data(table, 10)  # Generate 10 fallback rows
+            
+            return None
     
     def _generate_fallback_data(self, table: Table, row_count: int) -> List[Dict[str, Any]]:
         """Generate very basic fallback data when LLM generation fails.
@@ -597,40 +1346,19 @@ class DataSynthAgent(Agent):
             Data with correctly typed values
         """
         converted_data = []
+        col_index = {column.name.lower(): column for column in table.columns}
+        
+        # Resolve each key's converter once; None keeps values of unknown columns as-is
+        converters: Dict[str, Optional[Callable[[Any], Any]]] = {}
         
         for row in data:
             converted_row = {}
             for col_name, value in row.items():
-                column = table.get_column(col_name)
-                if column:
-                    # Convert based on column type
-                    if value is None:
-                        converted_row[col_name] = None
-                    elif column.is_numeric:
-                        try:
-                            if column.data_type in (ColumnType.INTEGER, ColumnType.BIGINT, 
-                                                  ColumnType.SMALLINT, ColumnType.TINYINT):
-                                converted_row[col_name] = int(value)
-                            else:
-                                converted_row[col_name] = float(value)
-                        except:
-                            # Fallback to original value if conversion fails
-                            converted_row[col_name] = value
-                    elif column.is_boolean:
-                        if isinstance(value, bool):
-                            converted_row[col_name] = value
-                        elif str(value).lower() in ('true', 't', 'yes', 'y', '1'):
-                            converted_row[col_name] = True
-                        elif str(value).lower() in ('false', 'f', 'no', 'n', '0'):
-                            converted_row[col_name] = False
-                        else:
-                            converted_row[col_name] = value
-                    else:
-                        # String, date, etc. - keep as string
-                        converted_row[col_name] = str(value)
-                else:
-                    # Column not found, keep original value
-                    converted_row[col_name] = value
+                if col_name not in converters:
+                    column = col_index.get(col_name.lower())
+                    converters[col_name] = _make_converter(column) if column else None
+                converter = converters[col_name]
+                converted_row[col_name] = converter(value) if converter and value is not None else value
             
             converted_data.append(converted_row)
         
@@ -647,6 +1375,10 @@ class DataSynthAgent(Agent):
         too expensive. It uses the sample rows generated by the LLM to learn patterns
         and then generates similar data algorithmically.
         
+        Tables made only of foreign keys into reference data need no samples; their
+        rows are drawn from the reference data, and rows with a duplicate primary
+        key are dropped, so fewer than ``row_count`` rows may be returned.
+        
         Args:
             schema: Complete schema
             table: Table to generate data for
@@ -656,8 +1388,11 @@ class DataSynthAgent(Agent):
         Returns:
             List of dictionaries representing the additional rows
         """
-        if not sample_rows:
+        from_references = not sample_rows and self._is_reference_sampled(schema, table)
+        if not sample_rows and not from_references:
             return []
+        sample_rows = sample_rows or []
+        templates = sample_rows or [{}]
         
         # This is a simplified implementation
         # A more sophisticated version would analyze value patterns and distributions
@@ -665,6 +1400,7 @@ class DataSynthAgent(Agent):
         
         # Get primary key columns
         pk_columns = table.primary_key.columns if table.primary_key else []
+        col_index = {column.name.lower(): column for column in table.columns}
         
         # Get all generated primary key values to avoid duplicates
         existing_pk_values = set()
@@ -673,36 +1409,78 @@ class DataSynthAgent(Agent):
                 pk_value = tuple(row.get(col) for col in pk_columns)
                 existing_pk_values.add(pk_value)
         
-        # Get foreign key mappings and valid values
+        # Colliding integer keys take the next unused id; colliding string keys
+        # get a running suffix. Other key shapes use the generic probe loop below.
+        pk_column_defs = [col_index.get(col.lower()) for col in pk_columns]
+        next_int = None
+        suffixes = None
+        if len(pk_columns) == 1 and pk_column_defs[0] and pk_column_defs[0].data_type in _INTEGER_TYPES:
+            next_int = 1 + max(
+                (value[0] for value in existing_pk_values if isinstance(value[0], int)), default=0
+            )
+        elif pk_columns and all(column and column.is_string for column in pk_column_defs):
+            suffixes = itertools.count(1)
+        
+        rng = self._table_rng(table.name)
+        
+        # Randomly select a sample row as the starting point for each new row
+        template_indices = rng.integers(len(templates), size=row_count)
+        
+        # Vary numeric sample values slightly, one column at a time
+        perturbed = {}
+        for col_name in dict.fromkeys(name for row in sample_rows for name in row):
+            column = col_index.get(col_name.lower())
+            if not column or not column.is_numeric:
+                continue
+            samples = np.array([
+                row.get(col_name) if isinstance(row.get(col_name), (int, float)) else np.nan
+                for row in sample_rows
+            ], dtype=np.float64)
+            values = samples[template_indices] * rng.uniform(0.8, 1.2, size=row_count)
+            if column.data_type in _INTEGER_TYPES:
+                # Non-numeric template values are copied as-is, so their slots don't matter
+                values = np.nan_to_num(values).astype(np.int64)
+            perturbed[col_name] = values.tolist()
+        
+        # Draw the random suffixes for string columns up front as well
+        letter_suffixes = {}
+        for col_name in dict.fromkeys(name for row in sample_rows for name in row):
+            column = col_index.get(col_name.lower())
+            if column and not column.is_numeric and column.is_string:
+                letters = _ALPHABET[rng.integers(len(_ALPHABET), size=(row_count, 2))]
+                letter_suffixes[col_name] = np.char.add(letters[:, 0], letters[:, 1]).tolist()
+        number_suffixes = {}
+        for column in table.columns:
+            if column.data_type in _STRING_TYPES:
+                varied = (rng.random(row_count) < 0.5).tolist()
+                numbers = rng.integers(1, 1000, size=row_count).tolist()
+                number_suffixes[column.name] = [
+                    str(number) if vary else None for vary, number in zip(varied, numbers)
+                ]
+        
+        # Get foreign key mappings and select reference rows for every new row up front
         fk_mappings = {}
         for fk in table.foreign_keys:
-            ref_table = schema.get_table(fk.ref_table)
+            ref_table = self._get_table(schema, fk.ref_table)
             if ref_table and ref_table.reference_data and ref_table.reference_data.rows:
-                # Extract valid values for this foreign key
-                valid_values = []
-                for ref_row in ref_table.reference_data.rows:
-                    # Each reference row should have values for all the reference columns
-                    if all(col in ref_row for col in fk.ref_columns):
-                        values = [ref_row[col] for col in fk.ref_columns]
-                        valid_values.append(values)
-                
-                # Get distribution weights if available
-                weights = None
-                if ref_table.reference_data.distribution_strategy == "weighted_random":
-                    weights = ref_table.reference_data.get_weighted_distribution()
+                valid_values, p = self._fk_candidates(ref_table, fk.ref_columns)
+                if not valid_values:
+                    continue
                 
-                fk_mappings[tuple(fk.columns)] = (valid_values, weights)
+                selected = rng.choice(len(valid_values), size=row_count, p=p)
+                fk_mappings[tuple(fk.columns)] = (valid_values, selected.tolist())
+        
+        # Foreign key values must match the reference data, so they are never varied
+        fk_column_names = {col for fk_columns in fk_mappings for col in fk_columns}
         
         # Generate additional rows
-        for _ in range(row_count):
-            new_row = {}
-            
-            # Randomly select and modify a sample row as a starting point
-            template_row = random.choice(sample_rows)
+        for row_idx, template_idx in enumerate(template_indices.tolist()):
+            new_row = dict.fromkeys(column.name for column in table.columns) if from_references else {}
+            template_row = templates[template_idx]
             
             # Start by copying values from the template
             for col_name, value in template_row.items():
-                column = table.get_column(col_name)
+                column = col_index.get(col_name.lower())
                 if not column:
                     continue
                 
@@ -710,19 +1488,14 @@ class DataSynthAgent(Agent):
                 if column.is_numeric:
                     # For numeric columns, vary the value slightly
                     if isinstance(value, (int, float)):
-                        variation = random.uniform(0.8, 1.2)
-                        new_value = value * variation
-                        if column.data_type in (ColumnType.INTEGER, ColumnType.BIGINT, 
-                                              ColumnType.SMALLINT, ColumnType.TINYINT):
-                            new_value = int(new_value)
-                        new_row[col_name] = new_value
+                        new_row[col_name] = perturbed[col_name][row_idx]
                     else:
                         new_row[col_name] = value
                 elif column.is_string:
                     # For string columns, try to maintain the pattern
                     if isinstance(value, str):
                         # Simple variation - append/prepend some random characters
-                        suffix = ''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=2))
+                        suffix = letter_suffixes[col_name][row_idx]
                         
                         # Ensure we respect the column's length constraint if specified
                         if column.length and isinstance(column.length, int) and column.length > 0:
@@ -740,31 +1513,40 @@ class DataSynthAgent(Agent):
                     new_row[col_name] = value
             
             # Handle foreign keys using reference data and weights
-            for fk_columns, (valid_values, weights) in fk_mappings.items():
-                if valid_values:
-                    # Select a valid value set based on weights
-                    if weights:
-                        indices = list(range(len(valid_values)))
-                        weight_values = list(weights.values())
-                        selected_idx = random.choices(indices, weights=weight_values, k=1)[0]
-                        selected_values = valid_values[selected_idx]
-                    else:
-                        selected_values = random.choice(valid_values)
-                    
-                    # Assign to row
-                    for i, col in enumerate(fk_columns):
-                        if i < len(selected_values):
-                            new_row[col] = selected_values[i]
+            for fk_columns, (valid_values, selected) in fk_mappings.items():
+                selected_values = valid_values[selected[row_idx]]
+                
+                # Assign to row
+                for i, col in enumerate(fk_columns):
+                    if i < len(selected_values):
+                        new_row[col] = selected_values[i]
             
             # Ensure primary key is unique
             if pk_columns:
                 # Create a unique suffix for primary key if needed
                 pk_value = tuple(new_row.get(col) for col in pk_columns)
                 suffix = 1
+                if from_references and pk_value in existing_pk_values:
+                    # Changing the key would break its foreign keys; drop the duplicate
+                    continue
+                if next_int is not None:
+                    value = pk_value[0]
+                    if pk_value in existing_pk_values or not isinstance(value, int):
+                        value = next_int
+                        new_row[pk_columns[0]] = value
+                        pk_value = (value,)
+                    next_int = max(next_int, value + 1)
+                elif suffixes is not None and pk_value in existing_pk_values:
+                    base_values = [str(value if value is not None else '') for value in pk_value]
+                    while pk_value in existing_pk_values:
+                        suffix = next(suffixes)
+                        pk_value = tuple(f"{base}_{suffix}" for base in base_values)
+                    new_row.update(zip(pk_columns, pk_value))
+                
                 while pk_value in existing_pk_values:
                     # Modify the primary key value
                     for col in pk_columns:
-                        column = table.get_column(col)
+                        column = col_index.get(col.lower())
                         if column and column.is_numeric:
                             new_row[col] = int(new_row.get(col, 0)) + suffix
                         elif column and column.is_string:
@@ -780,16 +1562,16 @@ class DataSynthAgent(Agent):
             # Access columns correctly using the list of Column objects, not as a dictionary
             for column in table.columns:
                 col_name = column.name
-                if col_name not in new_row:
+                if col_name not in new_row or col_name in fk_column_names:
                     continue
                 
                 # For strings, handle length constraints
-                if column.data_type in [ColumnType.VARCHAR, ColumnType.NVARCHAR, ColumnType.CHAR, ColumnType.NCHAR, ColumnType.TEXT]:
+                if column.data_type in _STRING_TYPES:
                     value = str(new_row[col_name])
                     
                     # Add some variation by modifying part of the string
-                    if random.random() < 0.5 and len(value) > 3:
-                        suffix = str(random.randint(1, 999))
+                    suffix = number_suffixes[col_name][row_idx]
+                    if suffix and len(value) > 3:
                         
                         # Ensure we respect the column's length constraint if specified
                         if column.length and isinstance(column.length, int) and column.length > 0:
@@ -805,6 +1587,68 @@ class DataSynthAgent(Agent):
         
         return additional_rows
     
+    def _table_rng(self, table_name: str) -> np.random.Generator:
+        """Create the random generator for one algorithmic generation call.
+        
+        With a seed, the generator depends only on the seed, the table and how
+        many times the table has been generated before, so results don't
+        depend on which tables happen to run concurrently.
+        
+        Args:
+            table_name: Table being generated
+            
+        Returns:
+            NumPy random generator
+        """
+        if self.seed is None:
+            return np.random.default_rng()
+        
+        with self._rng_calls_lock:
+            call = self._rng_calls.get(table_name, 0)
+            self._rng_calls[table_name] = call + 1
+        
+        table_key = int.from_bytes(hashlib.blake2b(table_name.encode('utf-8'), digest_size=8).digest(), 'little')
+        return np.random.default_rng([self.seed, table_key, call])
+    
+    def _fk_candidates(self, ref_table: Table,
+                       ref_columns: List[str]) -> Tuple[List[List[Any]], Optional[np.ndarray]]:
+        """Get the values a foreign key can take from a reference table.
+        
+        Results are cached for the run, so foreign keys that reference the same
+        columns share one list, whichever table they belong to.
+        
+        Args:
+            ref_table: Referenced table with reference data
+            ref_columns: Referenced columns
+            
+        Returns:
+            Tuple of (value lists, selection probabilities or None for uniform)
+        """
+        key = (ref_table.name, tuple(ref_columns))
+        cached = self._fk_candidate_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        # Extract valid values for this foreign key
+        valid_values = []
+        row_indices = []
+        for i, ref_row in enumerate(ref_table.reference_data.rows):
+            # Each reference row should have values for all the reference columns
+            if all(col in ref_row for col in ref_columns):
+                valid_values.append([ref_row[col] for col in ref_columns])
+                row_indices.append(i)
+        
+        # Use distribution weights if available, for the rows we kept
+        p = None
+        if valid_values and ref_table.reference_data.distribution_strategy == "weighted_random":
+            weights = ref_table.reference_data.get_weighted_distribution()
+            weight_values = np.array([weights.get(i, 0.0) for i in row_indices])
+            if weight_values.sum() > 0:
+                p = weight_values / weight_values.sum()
+        
+        self._fk_candidate_cache[key] = (valid_values, p)
+        return valid_values, p
+    
     def _write_csv(self, data: List[Dict[str, Any]], output_file: Path) -> None:
         """Write data to a CSV file.
         
@@ -821,9 +1665,10 @@ class DataSynthAgent(Agent):
         # Get column names from the first row
         columns = list(data[0].keys())
         
-        with open(output_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=columns)
-            writer.writeheader()
-            writer.writerows(data)
+        with open(output_file, 'w', newline='', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            # Missing values are written empty; keys not in the first row are ignored
+            writer.writerows([row.get(col, "") for col in columns] for row in data)
         
         self.logger.info(f"Wrote {len(data)} rows to {output_file}") 
\ No newline at end of file
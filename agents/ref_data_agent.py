@@ -13,21 +13,32 @@ the Intermediate Representation (IR) with that data. It handles:
 
 import os
 import json
-import logging
-import time
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Union, Tuple
 
 from agents.base import Agent
-from models.ir import Schema, Table, ReferenceData
+from models.ir import Schema, ReferenceData
 from utils.ref_data_parser import (
     parse_multi_table_csv,
-    csv_to_ir,
-    update_schema_with_reference_data,
-    directory_to_ir
+    update_schema_with_reference_data_from_dict
 )
 from utils.llm import get_provider
 
+_JSON_DECODER = json.JSONDecoder()
+
+# Values that suggest a two-row reference table encodes a boolean
+_BOOLEAN_INDICATORS = frozenset({
+    'yes', 'no', 'y', 'n', 'true', 'false', 't', 'f',
+    '1', '0', 'active', 'inactive', 'enabled', 'disabled'
+})
+
+# Boolean indicators for the "positive" value
+_POSITIVE_INDICATORS = frozenset({'yes', 'y', 'true', 't', '1', 'active', 'enabled'})
+
+# Sample rows per table and overall size cap for reference data sent to the LLM
+_MAPPING_SAMPLE_ROWS = 3
+_MAPPING_CONTENT_MAX_CHARS = 16 * 1024
+
 
 class RefDataAgent(Agent):
     """
@@ -42,7 +53,15 @@ class RefDataAgent(Agent):
     """
     
     def __init__(self, run_id: str, artifacts_dir: str, **kwargs):
-        """Initialize the RefDataAgent."""
+        """Initialize the RefDataAgent.
+        
+        Args:
+            run_id: Unique identifier for this run
+            artifacts_dir: Directory for storing artifacts
+            **kwargs: Additional parameters (seed, llm_provider, llm_model, and
+                save_schema_artifacts, whether to save the input and output
+                schemas as artifacts)
+        """
         super().__init__(
             name="RefDataAgent",
             run_id=run_id,
@@ -53,8 +72,20 @@ class RefDataAgent(Agent):
         self.llm_model = kwargs.get("llm_model", "gpt-4o")
         self.provider = get_provider(self.llm_provider)
         
+        # Whether run() saves the input and output schema JSON as artifacts
+        self.save_schema_artifacts = kwargs.get("save_schema_artifacts", True)
+        
         # Store the last LLM call info for retry logic
         self._last_prompt = None
+        
+        # Bumped by _apply_mapping whenever reference data may have changed
+        self._reference_data_version = 0
+        
+        # Last schema serialized by _schema_json: (schema, reference data version, JSON)
+        self._schema_json_cache: Optional[Tuple[Schema, int, str]] = None
+        
+        # Parsed reference data files, keyed by (path, modification time)
+        self._parsed_cache: Dict[Tuple[str, float], Dict[str, Dict[str, List[Dict[str, str]]]]] = {}
     
     def llm_call(self, prompt: str) -> str:
         """
@@ -111,7 +142,8 @@ class RefDataAgent(Agent):
         self.logger.info(f"Processing reference data from: {ref_data_path}")
         
         # Save the input schema for reference
-        self.save_artifact("input_schema", schema.to_json(indent=2), is_json=True)
+        if self.save_schema_artifacts:
+            self.save_artifact("input_schema", self._schema_json(schema), is_json=True)
         
         # Process based on whether ref_data_path is a file or directory
         path = Path(ref_data_path)
@@ -128,11 +160,33 @@ class RefDataAgent(Agent):
             raise FileNotFoundError(f"Reference data path does not exist: {ref_data_path}")
         
         # Save the updated schema
-        self.save_artifact("output_schema", updated_schema.to_json(indent=2), is_json=True)
+        if self.save_schema_artifacts:
+            self.save_artifact("output_schema", self._schema_json(updated_schema), is_json=True)
+        self.flush_artifacts()
         
         # Return the updated schema
         return updated_schema
     
+    def _schema_json(self, schema: Schema) -> str:
+        """
+        Serialize a schema to pretty-printed JSON, reusing the last result.
+        
+        Reference data is the only part of the schema this agent changes, and every
+        change goes through _apply_mapping, so the cached JSON is reused until
+        _apply_mapping next runs.
+        
+        Args:
+            schema: The Schema IR
+            
+        Returns:
+            JSON representation of the schema
+        """
+        version = self._reference_data_version
+        cached = self._schema_json_cache
+        if cached is None or cached[0] is not schema or cached[1] != version:
+            cached = self._schema_json_cache = (schema, version, schema.to_json(indent=2))
+        return cached[2]
+    
     def _process_single_file(self, 
                            schema: Schema, 
                            file_path: Path,
@@ -153,7 +207,22 @@ class RefDataAgent(Agent):
             return self._intelligent_mapping(schema, file_path)
         else:
             # Use simple mapping based on table names
-            return update_schema_with_reference_data(schema, file_path)
+            return self._apply_mapping(schema, file_path, {})
+    
+    def _parse_cached(self, file_path: Path) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+        """
+        Parse a multi-table CSV file, reusing the result while the file is unchanged.
+        
+        Args:
+            file_path: Path to the multi-table CSV file
+            
+        Returns:
+            Parsed reference data, as returned by parse_multi_table_csv
+        """
+        key = (str(file_path), os.stat(file_path).st_mtime)
+        if key not in self._parsed_cache:
+            self._parsed_cache[key] = parse_multi_table_csv(file_path)
+        return self._parsed_cache[key]
     
     def _process_directory(self, 
                          schema: Schema, 
@@ -173,17 +242,55 @@ class RefDataAgent(Agent):
         updated_schema = schema
         
         # Process each CSV file in the directory
-        csv_files = list(dir_path.glob("*.csv"))
-        self.logger.info(f"Found {len(csv_files)} CSV files in directory")
+        with os.scandir(dir_path) as entries:
+            csv_files = sorted(
+                Path(entry.path) for entry in entries
+                if entry.name.lower().endswith(".csv") and entry.is_file()
+            )
+        self.logger.info("Found %d CSV files in directory", len(csv_files))
+        if not csv_files:
+            return updated_schema
+        
+        # Parse the files and find the ones name-based mapping can't cover
+        llm_files = [
+            csv_file for csv_file in csv_files
+            if self._needs_llm_mapping(schema, csv_file, intelligent_mapping)
+        ]
+        
+        # An empty mapping means name-based mapping; files that need the LLM
+        # share a single call so the schema is only sent once
+        mappings = {}
+        if len(llm_files) == 1:
+            mappings[llm_files[0]] = self._suggest_llm_mapping(schema, llm_files[0])
+        elif llm_files:
+            mappings = self._suggest_mappings_batch(schema, llm_files)
         
+        # Apply the mappings one at a time in filename order
         for csv_file in csv_files:
-            # Update schema with each file
-            updated_schema = self._process_single_file(
-                updated_schema, csv_file, intelligent_mapping
+            updated_schema = self._apply_mapping_with_fallback(
+                updated_schema, csv_file, mappings.get(csv_file, {})
             )
         
         return updated_schema
     
+    def _needs_llm_mapping(self,
+                           schema: Schema,
+                           file_path: Path,
+                           intelligent_mapping: bool) -> bool:
+        """
+        Parse a reference data file and check whether it needs an LLM mapping.
+        
+        Args:
+            schema: The Schema IR
+            file_path: Path to the reference data file
+            intelligent_mapping: Whether to use LLM for intelligent mapping
+            
+        Returns:
+            True if intelligent mapping is on and name-based mapping doesn't cover the file
+        """
+        self._parse_cached(file_path)
+        return intelligent_mapping and not self._has_clean_name_mapping(schema, file_path)
+    
     def _intelligent_mapping(self, 
                            schema: Schema, 
                            file_path: Path) -> Schema:
@@ -203,31 +310,73 @@ class RefDataAgent(Agent):
         Returns:
             Updated Schema IR
         """
-        # First, try simple name-based mapping
-        try:
-            schemas_data = parse_multi_table_csv(file_path)
-            simple_mapping = self._create_mapping_suggestion(schema, schemas_data)
+        mapping = self._suggest_mapping(schema, file_path)
+        return self._apply_mapping_with_fallback(schema, file_path, mapping)
+    
+    def _apply_mapping_with_fallback(self,
+                                     schema: Schema,
+                                     file_path: Path,
+                                     mapping: Dict[str, str]) -> Schema:
+        """
+        Apply a mapping, falling back to simple mapping if it can't be applied.
+        
+        Args:
+            schema: The Schema IR to update
+            file_path: Path to the reference data file
+            mapping: Mapping from reference table names to schema table names
             
-            # If we have a clean mapping (every ref table maps to a schema table),
-            # we can use simple mapping
-            if self._is_clean_mapping(simple_mapping):
-                self.logger.info("Using simple name-based mapping")
-                return update_schema_with_reference_data(schema, file_path)
+        Returns:
+            Updated Schema IR
+        """
+        try:
+            return self._apply_mapping(schema, file_path, mapping)
         except Exception as e:
-            self.logger.warning(f"Error in simple mapping: {str(e)}")
+            self.logger.error(f"Error applying mapping: {str(e)}")
+            # Fall back to simple mapping
+            self.logger.info("Falling back to simple mapping")
+            return self._apply_mapping(schema, file_path, {})
+    
+    def _suggest_mapping(self, schema: Schema, file_path: Path) -> Dict[str, str]:
+        """
+        Decide how the tables of a reference data file map to schema tables.
+        
+        Name-based mapping is used when it covers the file; otherwise the LLM
+        is asked for a mapping.
+        
+        Args:
+            schema: The Schema IR
+            file_path: Path to the reference data file
+            
+        Returns:
+            Mapping from reference table names to schema table names; empty
+            when name-based mapping should be used
+        """
+        # First, try simple name-based mapping
+        if self._has_clean_name_mapping(schema, file_path):
+            return {}
         
         # If simple mapping fails or is incomplete, use LLM
-        self.logger.info("Using LLM for intelligent mapping")
+        return self._suggest_llm_mapping(schema, file_path)
+    
+    def _suggest_llm_mapping(self, schema: Schema, file_path: Path) -> Dict[str, str]:
+        """
+        Ask the LLM how the tables of a reference data file map to schema tables.
         
-        # Read the reference data file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            ref_data_content = f.read()
+        Args:
+            schema: The Schema IR
+            file_path: Path to the reference data file
+            
+        Returns:
+            Mapping from reference table names to schema table names; empty
+            when the LLM call fails and name-based mapping should be used
+        """
+        self.logger.info("Using LLM for intelligent mapping")
         
         # Prepare the prompt for the LLM using externalized prompt template
         prompt_template = self.load_prompt("mapping")
         prompt = prompt_template.format(
-            schema_json=schema.to_json(indent=2),
-            ref_data_content=ref_data_content
+            schema_json=self._schema_json(schema),
+            ref_data_content=self._mapping_content(file_path)
         )
         
         self.save_prompt(prompt)
@@ -238,15 +387,139 @@ class RefDataAgent(Agent):
             self.save_llm_response(response, "mapping")
             
             # Parse the LLM response to get the mapping
-            mapping = self._parse_mapping_response(response)
-            
-            # Apply the mapping to update the schema
-            return self._apply_mapping(schema, file_path, mapping)
+            return self._parse_mapping_response(response)
         except Exception as e:
             self.logger.error(f"Error in LLM-based mapping: {str(e)}")
             # Fall back to simple mapping
             self.logger.info("Falling back to simple mapping")
-            return update_schema_with_reference_data(schema, file_path)
+            return {}
+    
+    def _suggest_mappings_batch(self, 
+                                schema: Schema, 
+                                file_paths: List[Path]) -> Dict[Path, Dict[str, str]]:
+        """
+        Ask the LLM for the mappings of several reference data files in one call.
+        
+        The schema is sent once, followed by a labelled summary of each file.
+        
+        Args:
+            schema: The Schema IR
+            file_paths: Paths to the reference data files
+            
+        Returns:
+            Mapping for each file; files the LLM leaves out get an empty mapping,
+            meaning name-based mapping
+        """
+        self.logger.info(f"Using LLM for intelligent mapping of {len(file_paths)} files")
+        
+        ref_data_blocks = "\n\n".join(
+            f"### File: {file_path.name}\n\n```\n{self._mapping_content(file_path)}\n```"
+            for file_path in file_paths
+        )
+        prompt_template = self.load_prompt("mapping_batch")
+        prompt = prompt_template.format(
+            schema_json=self._schema_json(schema),
+            ref_data_blocks=ref_data_blocks
+        )
+        
+        self.save_prompt(prompt)
+        
+        mappings = {}
+        try:
+            response = self.llm_call(prompt)
+            self.save_llm_response(response, "mapping_batch")
+            mappings = self._parse_mapping_response(response, key="mappings")
+        except Exception as e:
+            self.logger.error(f"Error in LLM-based mapping: {str(e)}")
+            self.logger.info("Falling back to simple mapping")
+        
+        result = {}
+        for file_path in file_paths:
+            mapping = mappings.get(file_path.name)
+            result[file_path] = mapping if isinstance(mapping, dict) else {}
+        return result
+    
+    def _has_clean_name_mapping(self, schema: Schema, file_path: Path) -> bool:
+        """
+        Check whether name-based mapping covers every table of a reference data file.
+        
+        Args:
+            schema: The Schema IR
+            file_path: Path to the reference data file
+            
+        Returns:
+            True if every reference table matches a schema table by name
+        """
+        try:
+            schemas_data = self._parse_cached(file_path)
+            simple_mapping = self._create_mapping_suggestion(schema, schemas_data)
+            
+            # If we have a clean mapping (every ref table maps to a schema table),
+            # we can use simple mapping
+            if self._is_clean_mapping(simple_mapping):
+                self.logger.info("Using simple name-based mapping")
+                return True
+        except Exception as e:
+            self.logger.warning("Error in simple mapping: %s", e)
+        return False
+    
+    def _mapping_content(self, file_path: Path) -> str:
+        """
+        Get the reference data content to show the LLM for mapping.
+        
+        The mapping only needs table names, columns and a few sample rows, so
+        the parsed data is summarized; the raw file is only used when it could
+        not be parsed.
+        
+        Args:
+            file_path: Path to the reference data file
+            
+        Returns:
+            Reference data content for the mapping prompt
+        """
+        try:
+            schemas_data = self._parse_cached(file_path)
+        except Exception:
+            schemas_data = None
+        if schemas_data:
+            return self._summarize_reference_data(schemas_data)
+        return file_path.read_text(encoding='utf-8')[:_MAPPING_CONTENT_MAX_CHARS]
+    
+    def _summarize_reference_data(self, 
+                                  schemas_data: Dict[str, Dict[str, List[Dict[str, str]]]]) -> str:
+        """
+        Summarize parsed reference data for the mapping prompt.
+        
+        Each table is written in the multi-table CSV layout with its header and
+        first few rows, and the summary is capped in size.
+        
+        Args:
+            schemas_data: Parsed reference data
+            
+        Returns:
+            Reference data summary text
+        """
+        lines = []
+        size = 0
+        for schema_name, tables in schemas_data.items():
+            for table_name, rows in tables.items():
+                section = [f"# [{schema_name}.{table_name}]"]
+                if rows:
+                    section.append(", ".join(rows[0].keys()))
+                    for row in rows[:_MAPPING_SAMPLE_ROWS]:
+                        section.append(", ".join(str(value) for value in row.values()))
+                    if len(rows) > _MAPPING_SAMPLE_ROWS:
+                        section.append(f"... ({len(rows) - _MAPPING_SAMPLE_ROWS} more rows)")
+                section.append("")
+                
+                text = "\n".join(section)
+                if size + len(text) > _MAPPING_CONTENT_MAX_CHARS:
+                    lines.append("... (remaining tables omitted)")
+                    return "\n".join(lines)
+                lines.append(text)
+                size += len(text) + 1
+        
+        return "\n".join(lines)
     
     def _create_mapping_suggestion(self, 
                                  schema: Schema, 
@@ -262,19 +535,18 @@ class RefDataAgent(Agent):
             Dictionary mapping reference table names to schema table names
         """
         mapping = {}
+        if not schemas_data:
+            return mapping
         
         # Get all schema table names
         schema_tables = {table.name.lower(): table.name for table in schema.tables}
         
-        # Check each reference data table
+        # Check each reference data table (matched by table name, ignoring its schema)
         for schema_name, tables in schemas_data.items():
-            for ref_table_name in tables.keys():
-                # Try exact match
-                if ref_table_name.lower() in schema_tables:
-                    mapping[f"{schema_name}.{ref_table_name}"] = schema_tables[ref_table_name.lower()]
-                # Try without schema qualification
-                elif ref_table_name.lower() in schema_tables:
-                    mapping[f"{schema_name}.{ref_table_name}"] = schema_tables[ref_table_name.lower()]
+            for ref_table_name in tables:
+                schema_table = schema_tables.get(ref_table_name.lower())
+                if schema_table is not None:
+                    mapping[f"{schema_name}.{ref_table_name}"] = schema_table
         
         return mapping
     
@@ -305,34 +577,32 @@ class RefDataAgent(Agent):
         """
         prompt_template = self.load_prompt("mapping")
         return prompt_template.format(
-            schema_json=schema.to_json(indent=2),
+            schema_json=self._schema_json(schema),
             ref_data_content=ref_data_content
         )
     
-    def _parse_mapping_response(self, response: str) -> Dict[str, str]:
+    def _parse_mapping_response(self, response: str, key: str = "mapping") -> Dict[str, Any]:
         """
         Parse the LLM response to extract the mapping.
         
         Args:
             response: LLM response text
+            key: Top-level key holding the mapping ("mappings" for batch responses)
             
         Returns:
             Dictionary mapping reference table names to schema table names
         """
         try:
-            # Try to extract JSON from the response
+            # Decode the JSON object starting at the first brace, ignoring anything after it
             json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            
-            if json_start == -1 or json_end == 0:
+            if json_start == -1:
                 raise ValueError("No JSON found in response")
             
-            json_str = response[json_start:json_end]
-            data = json.loads(json_str)
+            data, _ = _JSON_DECODER.raw_decode(response, json_start)
             
             # Extract the mapping
-            if "mapping" in data:
-                return data["mapping"]
+            if key in data:
+                return data[key]
             else:
                 return data  # Assume the whole JSON is the mapping
         except Exception as e:
@@ -354,38 +624,44 @@ class RefDataAgent(Agent):
         Returns:
             Updated Schema IR
         """
+        # Parse the reference data file
+        schemas_data = self._parse_cached(file_path)
+        
+        # Tables are updated in place, so invalidate the serialized schema first
+        self._reference_data_version += 1
+        
         if not mapping:
             # If mapping is empty, fall back to simple mapping
-            return update_schema_with_reference_data(schema, file_path)
+            return update_schema_with_reference_data_from_dict(schema, schemas_data)
         
-        # Parse the reference data file
-        schemas_data = parse_multi_table_csv(file_path)
+        # Index schema tables by lowercase name, keeping the first match as get_table does
+        tables_by_name = {}
+        for table in schema.tables:
+            tables_by_name.setdefault(table.name.lower(), table)
         
         # Apply the mapping
         for ref_table, schema_table in mapping.items():
             # Split ref_table into schema and table names
-            parts = ref_table.split('.')
-            if len(parts) == 2:
-                ref_schema, ref_table_name = parts
-            else:
+            ref_schema, sep, ref_table_name = ref_table.partition('.')
+            if not sep or '.' in ref_table_name:
                 ref_schema = "dbo"  # Default schema
                 ref_table_name = ref_table
             
             # Check if we have this table in the reference data
             if ref_schema in schemas_data and ref_table_name in schemas_data[ref_schema]:
                 # Get the schema table
-                table = schema.get_table(schema_table)
+                table = tables_by_name.get(schema_table.lower())
                 
                 if table:
                     # Get the reference data rows
                     rows = schemas_data[ref_schema][ref_table_name]
                     
                     # Determine if we have distribution weights
-                    has_weights = any("weight" in row for row in rows)
+                    has_weights, is_boolean = self._classify_rows(rows)
                     
                     # If we don't have weights but it's a reference table with boolean YES/NO values,
                     # we can suggest proper weights (e.g., more "YES" than "NO")
-                    if not has_weights and self._is_boolean_ref_table(rows):
+                    if is_boolean:
                         rows = self._add_boolean_weights(rows)
                     
                     # Update the table with reference data
@@ -398,14 +674,32 @@ class RefDataAgent(Agent):
                         description=f"Reference data for {schema_table}"
                     )
                     
-                    self.logger.info(f"Applied reference data to table {schema_table}")
+                    self.logger.info("Applied reference data to table %s", schema_table)
                 else:
-                    self.logger.warning(f"Schema table {schema_table} not found")
+                    self.logger.warning("Schema table %s not found", schema_table)
             else:
-                self.logger.warning(f"Reference table {ref_table} not found in data")
+                self.logger.warning("Reference table %s not found in data", ref_table)
         
         return schema
     
+    def _classify_rows(self, rows: List[Dict[str, str]]) -> Tuple[bool, bool]:
+        """
+        Classify reference data rows in a single pass.
+        
+        Args:
+            rows: List of data rows
+            
+        Returns:
+            Tuple of (has_weights, is_boolean), where is_boolean is only True for
+            unweighted boolean reference tables
+        """
+        # Boolean tables have exactly two rows, so scanning for weights is the only
+        # step that can touch every row; it stops at the first weighted row
+        for row in rows:
+            if "weight" in row:
+                return True, False
+        return False, self._is_boolean_ref_table(rows)
+    
     def _is_boolean_ref_table(self, rows: List[Dict[str, str]]) -> bool:
         """
         Check if this looks like a boolean reference table (YES/NO, Y/N, etc.).
@@ -428,28 +722,17 @@ class RefDataAgent(Agent):
         if len(rows[0]) != 2:
             return False
         
-        # Get column names
-        columns = list(rows[0].keys())
-        
-        # Get values from both columns in both rows
-        values = []
-        for col in columns:
-            values.extend([rows[0][col], rows[1][col]])
-        
-        # Check for common boolean indicators
-        boolean_indicators = [
-            'yes', 'no', 'y', 'n', 'true', 'false', 't', 'f',
-            '1', '0', 'active', 'inactive', 'enabled', 'disabled'
-        ]
-        
-        # Convert values to lowercase for comparison
-        lower_values = [str(v).lower() for v in values]
-        
-        # Count how many boolean indicators we have
-        count = sum(1 for v in lower_values if v in boolean_indicators)
-        
         # If at least half of the values are boolean indicators, consider it a boolean table
-        return count >= len(values) // 2
+        first, second = rows
+        threshold = len(first)  # half of the values in both columns of both rows
+        count = 0
+        for col in first:
+            for v in (first[col], second[col]):
+                if str(v).lower() in _BOOLEAN_INDICATORS:
+                    count += 1
+                    if count >= threshold:
+                        return True
+        return False
     
     def _add_boolean_weights(self, rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
@@ -467,25 +750,24 @@ class RefDataAgent(Agent):
         if len(rows) != 2:
             return rows
         
-        # Deep copy the rows
-        new_rows = [dict(row) for row in rows]
-        
         # Determine which row is the "positive" one
-        positive_indicators = ['yes', 'y', 'true', 't', '1', 'active', 'enabled']
-        
         positive_index = -1
-        for i, row in enumerate(new_rows):
+        for i, row in enumerate(rows):
             # Check all values in this row
             for val in row.values():
-                if str(val).lower() in positive_indicators:
+                if str(val).lower() in _POSITIVE_INDICATORS:
                     positive_index = i
                     break
             if positive_index >= 0:
                 break
         
-        # If we found a positive value, assign weights
-        if positive_index >= 0:
-            new_rows[positive_index]['weight'] = 0.7
-            new_rows[1 - positive_index]['weight'] = 0.3
+        if positive_index < 0:
+            return rows
+        
+        # The parsed rows are shared with the parse cache, so only the two
+        # weighted rows are copied rather than modified in place
+        new_rows = list(rows)
+        new_rows[positive_index] = {**rows[positive_index], 'weight': 0.7}
+        new_rows[1 - positive_index] = {**rows[1 - positive_index], 'weight': 0.3}
         
         return new_rows 
\ No newline at end of file
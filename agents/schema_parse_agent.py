@@ -5,16 +5,168 @@ This agent uses LLM to parse SQL Server CREATE scripts and extract the schema in
 into a structured IR model that can be used by downstream agents in the pipeline.
 """
 
+import hashlib
 import json
 import os
+import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any
 
 from agents.base import Agent
+from constants import SCHEMA_PARSE_BASE_TOKENS, SCHEMA_PARSE_TOKENS_PER_DEFINITION, MIN_SCHEMA_PARSE_TOKENS
 from models.ir import Schema, Table, Column, ColumnType, PrimaryKey, ForeignKey, CheckConstraint
 from utils.file_io import read_file, write_json, write_file
 from utils.llm import get_provider
+from utils.sql_parser import parse_create_table, split_statements, SQLParseError
+
+_CREATE_TABLE_RE = re.compile(r"CREATE\s+TABLE\b", re.IGNORECASE)
+
+# ALTER TABLE statements that add a constraint
+_ADD_CONSTRAINT_RE = re.compile(
+    r"ALTER\s+TABLE\b.*?\bADD\s+(?:CONSTRAINT|FOREIGN\s+KEY)\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+# CREATE TABLE header, capturing the unqualified table name
+_CREATE_TABLE_NAME_RE = re.compile(
+    r'CREATE\s+TABLE\s+(?:(?:\[[^\]]*\]|"[^"]*"|\w+)\s*\.\s*)*(\[[^\]]*\]|"[^"]*"|\w+)',
+    re.IGNORECASE
+)
+_WORD_RE = re.compile(r"\w+")
+
+# Separator between the CREATE TABLE statements of a batch sent in one call
+_BATCH_SEPARATOR = "\n\n"
+
+# JSON schema template for the IR returned by the LLM; shared, so never mutate it
+_SCHEMA_TEMPLATE: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "description": "Name of the schema"},
+        "description": {"type": "string", "description": "Description of the schema"},
+        "tables": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "description": "Name of the table"},
+                    "description": {"type": "string", "description": "Description of the table"},
+                    "columns": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "Name of the column"},
+                                "data_type": {
+                                    "type": "object",
+                                    "properties": {
+                                        "name": {"type": "string", "description": "SQL Server data type name"},
+                                        "length": {"type": ["integer", "null"], "description": "Length for string types"},
+                                        "precision": {"type": ["integer", "null"], "description": "Precision for numeric types"},
+                                        "scale": {"type": ["integer", "null"], "description": "Scale for numeric types"},
+                                    },
+                                    "required": ["name"]
+                                },
+                                "nullable": {"type": "boolean", "description": "Whether the column can be NULL"},
+                                "default_value": {"type": ["string", "null"], "description": "Default value for the column, if any"},
+                                "is_identity": {"type": "boolean", "description": "Whether the column is an identity column"},
+                                "description": {"type": "string", "description": "Description of the column"}
+                            },
+                            "required": ["name", "data_type", "nullable"]
+                        }
+                    },
+                    "primary_key": {
+                        "type": ["object", "null"],
+                        "properties": {
+                            "name": {"type": "string", "description": "Name of the primary key constraint"},
+                            "columns": {"type": "array", "items": {"type": "string"}, "description": "Columns in the primary key"},
+                        },
+                        "required": ["name", "columns"]
+                    },
+                    "foreign_keys": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "Name of the foreign key constraint"},
+                                "columns": {"type": "array", "items": {"type": "string"}, "description": "Columns in the foreign key"},
+                                "ref_table": {"type": "string", "description": "Referenced table"},
+                                "ref_columns": {"type": "array", "items": {"type": "string"}, "description": "Referenced columns"},
+                                "on_delete": {"type": "string", "description": "ON DELETE action"},
+                                "on_update": {"type": "string", "description": "ON UPDATE action"},
+                            },
+                            "required": ["name", "columns", "ref_table", "ref_columns"]
+                        }
+                    },
+                    "check_constraints": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "Name of the check constraint"},
+                                "definition": {"type": "string", "description": "SQL definition of the constraint"},
+                            },
+                            "required": ["name", "definition"]
+                        }
+                    },
+                    "is_reference_table": {"type": "boolean", "description": "Whether this is a reference/lookup table"}
+                },
+                "required": ["name", "columns"]
+            }
+        }
+    },
+    "required": ["name", "tables"]
+}
+
+
+def _replace_in_strings(value: Any, old: str, new: str) -> Any:
+    """Replace a substring in every string of a to_dict() structure, except data type names."""
+    if isinstance(value, str):
+        return value.replace(old, new)
+    if isinstance(value, list):
+        return [_replace_in_strings(item, old, new) for item in value]
+    if isinstance(value, dict):
+        return {
+            key: item if key == "data_type" else _replace_in_strings(item, old, new)
+            for key, item in value.items()
+        }
+    return value
+
+
+def _count_definitions(sql_script: str) -> int:
+    """Estimate the number of column and constraint definitions in some SQL.
+    
+    Counted as the commas plus one per CREATE TABLE or ALTER TABLE ... ADD, which
+    overcounts a little (e.g. DECIMAL(10, 2)) but doesn't undercount.
+    """
+    return (
+        sql_script.count(",")
+        + len(_CREATE_TABLE_RE.findall(sql_script))
+        + len(_ADD_CONSTRAINT_RE.findall(sql_script))
+    )
+
+
+def _parse_token_budget(sql_script: str) -> int:
+    """Estimate the output tokens the LLM needs to return the IR for some SQL.
+    
+    The response holds a JSON object per column or constraint, so the budget
+    follows the number of definitions rather than the size of the DDL.
+    """
+    return max(
+        MIN_SCHEMA_PARSE_TOKENS,
+        SCHEMA_PARSE_BASE_TOKENS + SCHEMA_PARSE_TOKENS_PER_DEFINITION * _count_definitions(sql_script)
+    )
+
+
+def _rename_table(table: Table, old_name: str, new_name: str) -> Table:
+    """Copy a parsed table for a definition that only differs in the table name.
+    
+    The name is replaced wherever it occurs, e.g. in constraint names, self
+    references and check definitions, just as it differs in the SQL.
+    """
+    return Table.from_dict(_replace_in_strings(table.to_dict(), old_name, new_name))
 
 
 class SchemaParseAgent(Agent):
@@ -32,6 +184,9 @@ class SchemaParseAgent(Agent):
         seed: Optional[int] = None,
         llm_provider: str = "openai",
         llm_model: str = "gpt-4o",
+        llm_cache: bool = True,
+        parallelism: int = 8,
+        deterministic_parsing: bool = True,
     ):
         """Initialize Schema Parser Agent.
         
@@ -41,16 +196,28 @@ class SchemaParseAgent(Agent):
             seed: Random seed for reproducibility
             llm_provider: Name of the LLM provider to use
             llm_model: Name of the LLM model to use
+            llm_cache: Whether to reuse parse responses cached on disk
+            parallelism: Maximum number of concurrent LLM calls when parsing a
+                large script table by table
+            deterministic_parsing: Whether to parse well-formed CREATE TABLE
+                statements of large scripts without the LLM
         """
         super().__init__("SchemaParser", run_id, artifacts_dir, seed)
         self.llm_provider = llm_provider
         self.llm_model = llm_model
         self.provider = get_provider(llm_provider)
         
-        # Store the last LLM calls for retry logic
-        self._last_prompt = None
-        self._last_schema_template = None
-
+        # Parsing runs at temperature 0, so responses are cached across runs under
+        # artifacts_dir/llm_cache, keyed by the full prompt and request settings
+        self.llm_cache = llm_cache
+        
+        self.parallelism = parallelism
+        self.deterministic_parsing = deterministic_parsing
+        
+        # Store the last LLM call for retry logic, per thread since the tables of
+        # a large script are parsed concurrently
+        self._local = threading.local()
+    
     def run(
         self, 
         sql_script_path: Union[str, Path],
@@ -93,6 +260,7 @@ class SchemaParseAgent(Agent):
             
             self.logger.info(f"Successfully parsed schema '{schema.name}' with {len(schema.tables)} tables")
         
+        self.flush_artifacts()
         return schema
     
     def _parse_sql_to_schema(
@@ -115,9 +283,32 @@ class SchemaParseAgent(Agent):
         """
         self.logger.info(f"Processing SQL script ({len(sql_script)} characters)")
         
+        # Don't spend an LLM call on a script without any table DDL, e.g. an empty
+        # or comment-only file
+        statements = split_statements(sql_script)
+        if not any(_CREATE_TABLE_RE.search(s) or _ADD_CONSTRAINT_RE.search(s) for s in statements):
+            self.logger.warning("No CREATE TABLE or constraint statements found in SQL script")
+            return Schema(name=schema_name, tables=[], description=f"SQL Server schema {schema_name}")
+        
         # If the script is too large, we'll need to chunk it
         if len(sql_script) > chunk_size:
-            return self._process_large_script(sql_script, schema_name, chunk_size, max_tokens)
+            return self._process_large_script(sql_script, schema_name, chunk_size, max_tokens, statements)
+        
+        return self._parse_with_llm(sql_script, schema_name, max_tokens)
+    
+    def _parse_with_llm(self, sql_script: str, schema_name: str, max_tokens: int) -> Optional[Schema]:
+        """Parse SQL into an IR Schema with a single LLM call, whatever its size.
+        
+        Args:
+            sql_script: SQL statements to parse
+            schema_name: Name to use for the schema
+            max_tokens: Maximum tokens to generate in the LLM response
+            
+        Returns:
+            A Schema object representing the Intermediate Representation
+        """
+        # The JSON response grows with the DDL, so small calls get a smaller budget
+        max_tokens = min(max_tokens, _parse_token_budget(sql_script))
         
         # Generate JSON schema template for the IR
         schema_template = self._get_schema_template(schema_name)
@@ -130,28 +321,25 @@ class SchemaParseAgent(Agent):
         )
         
         # Store for retry logic
-        self._last_prompt = prompt
-        self._last_schema_template = schema_template
+        self._local.last_prompt = prompt
+        self._local.last_schema_template = schema_template
         
         # Save the prompt as an artifact
         self.save_prompt(prompt)
         
         # Call LLM to parse the SQL script
         try:
-            schema_json = self.provider.generate_json(
-                prompt,
-                schema_template,
-                temperature=0.0,
-                seed=self.seed,
-                max_tokens=max_tokens,
-                model=self.llm_model
-            )
+            schema_json, cache_path = self._generate_schema_json(prompt, schema_template, max_tokens)
             
             # Save the response
             self.save_llm_response(json.dumps(schema_json, indent=2), "schema")
             
             # Convert the JSON response to a Schema object
             schema = self._create_schema_from_llm_response(schema_json)
+            
+            # Only cache responses that convert, so a bad one isn't replayed on every run
+            if cache_path:
+                self._store_cached_response(cache_path, schema_json)
             return schema
             
         except Exception as e:
@@ -159,6 +347,72 @@ class SchemaParseAgent(Agent):
             self.logger.error(f"Error parsing schema: {str(e)}")
             return self.handle_llm_error(e)
     
+    def _generate_schema_json(
+        self,
+        prompt: str,
+        schema_template: Dict[str, Any],
+        max_tokens: int,
+    ) -> Tuple[Dict[str, Any], Optional[Path]]:
+        """Get the LLM's JSON response for a parse prompt, using the disk cache when enabled.
+        
+        A fresh response isn't cached here; the caller stores it with
+        _store_cached_response once it has been converted.
+        
+        Args:
+            prompt: The parse prompt
+            schema_template: JSON schema template for the response
+            max_tokens: Maximum tokens to generate in the LLM response
+            
+        Returns:
+            Tuple of (JSON response from the LLM, cache path to store a fresh
+            response under, or None if it came from the cache or caching is disabled)
+        """
+        cache_path = self._llm_cache_path(prompt, max_tokens)
+        if cache_path and cache_path.exists():
+            return json.loads(cache_path.read_text(encoding='utf-8')), None
+        
+        schema_json = self.provider.generate_json(
+            prompt,
+            schema_template,
+            temperature=0.0,
+            seed=self.seed,
+            max_tokens=max_tokens,
+            model=self.llm_model
+        )
+        
+        return schema_json, cache_path
+    
+    def _store_cached_response(self, cache_path: Path, schema_json: Dict[str, Any]) -> None:
+        """Atomically write a parse response to the cache.
+        
+        Args:
+            cache_path: Path from _llm_cache_path
+            schema_json: JSON response from the LLM
+        """
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(schema_json), encoding='utf-8')
+        os.replace(tmp_path, cache_path)
+    
+    def _llm_cache_path(self, prompt: str, max_tokens: int) -> Optional[Path]:
+        """Get the cache file for a parse request.
+        
+        Args:
+            prompt: The parse prompt
+            max_tokens: Maximum tokens of the request
+            
+        Returns:
+            Path of the cached response, or None if caching is disabled
+        """
+        if not self.llm_cache:
+            return None
+        
+        key = "\0".join([
+            self.llm_provider, self.llm_model, str(self.seed), str(max_tokens), prompt
+        ])
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        return Path(self.artifacts_dir) / "llm_cache" / f"{digest}.json"
+    
     def _create_schema_from_llm_response(self, response: Dict[str, Any]) -> Schema:
         """Create a Schema object from the LLM response.
         
@@ -198,9 +452,9 @@ class SchemaParseAgent(Agent):
                     scale = col_data.get("scale")
                 
                 # Convert string data type to enum
-                try:
+                if isinstance(data_type_name, str):
                     data_type = ColumnType.from_sql_type(data_type_name)
-                except:
+                else:
                     data_type = ColumnType.UNKNOWN
                 
                 column = Column(
@@ -267,6 +521,7 @@ class SchemaParseAgent(Agent):
         schema_name: str, 
         chunk_size: int, 
         max_tokens: int,
+        statements: Optional[List[str]] = None,
     ) -> Optional[Schema]:
         """Process a large SQL script by chunking it.
         
@@ -277,112 +532,241 @@ class SchemaParseAgent(Agent):
             schema_name: Name to use for the schema
             chunk_size: Maximum characters to process in a single LLM call
             max_tokens: Maximum tokens to generate in the LLM response
+            statements: The script already split with split_statements, if available
             
         Returns:
             A Schema object representing the combined Intermediate Representation
         """
         self.logger.info(f"Script is large ({len(sql_script)} chars), processing in chunks")
         
-        # First, try to extract all CREATE TABLE statements
-        tables_sql = self._extract_create_tables(sql_script)
+        # First, try to extract all CREATE TABLE statements, splitting the script once
+        if statements is None:
+            statements = split_statements(sql_script)
+        tables_sql = self._extract_create_tables(sql_script, statements)
+        constraints_sql = self._extract_constraints(sql_script, statements)
         
         # Create an empty schema
         schema = Schema(name=schema_name, tables=[], description=f"SQL Server schema {schema_name}")
         
-        # Process each table
-        for i, table_sql in enumerate(tables_sql):
-            self.logger.info(f"Processing table {i+1}/{len(tables_sql)}")
+        # Parse what we can without the LLM, then pack the remaining tables into
+        # batches that each fit in a single call
+        tables_by_position: Dict[int, List[Table]] = {}
+        pending = []
+        for position, table_sql in enumerate(tables_sql):
+            table = self._parse_table_deterministically(table_sql)
+            if table:
+                tables_by_position[position] = [table]
+            else:
+                pending.append(position)
+        
+        # Definitions that differ only in the table name (e.g. audit or partition
+        # copies) are sent once, and the parsed table is renamed for the copies
+        pending, copies = self._group_duplicate_tables(tables_sql, pending)
+        batches = self._pack_table_batches(tables_sql, pending, chunk_size, max_tokens)
+        
+        # The batch calls are independent, so run them concurrently along with
+        # the call for constraints that are defined separately
+        self.logger.info(f"Processing {len(tables_sql)} tables ({len(batches)} LLM calls)")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.parallelism, len(batches) + 1))) as executor:
+            constraints_future = None
+            if constraints_sql:
+                self.logger.info("Processing separate constraints")
+                constraints_future = executor.submit(
+                    self._parse_with_llm, constraints_sql, schema_name, max_tokens
+                )
             
-            # Create a mini-schema with just this table
-            table_schema = self._parse_sql_to_schema(table_sql, schema_name, chunk_size, max_tokens)
+            batch_futures = [
+                executor.submit(
+                    self._parse_table_batch,
+                    [tables_sql[position] for position in batch], schema_name, max_tokens
+                )
+                for batch in batches
+            ]
             
-            # If successful, add the table to our schema
-            if table_schema and table_schema.tables:
-                schema.tables.extend(table_schema.tables)
-        
-        # Process constraints that might be defined separately
-        constraints_sql = self._extract_constraints(sql_script)
-        if constraints_sql:
-            self.logger.info("Processing separate constraints")
-            constraints_schema = self._parse_sql_to_schema(constraints_sql, schema_name, chunk_size, max_tokens)
+            # A batch's tables take the place of its first statement
+            for batch, batch_future in zip(batches, batch_futures):
+                tables_by_position[batch[0]] = batch_future.result()
+            
+            if copies:
+                parsed_tables = {
+                    table.name.rsplit('.', 1)[-1].lower(): table
+                    for position_tables in tables_by_position.values()
+                    for table in position_tables
+                }
+                for position, (original_name, copy_name) in copies.items():
+                    original = parsed_tables.get(original_name.lower())
+                    if original:
+                        tables_by_position[position] = [_rename_table(original, original_name, copy_name)]
+                    else:
+                        table_schema = self._parse_with_llm(tables_sql[position], schema_name, max_tokens)
+                        tables_by_position[position] = table_schema.tables if table_schema else []
+            
+            # Add the tables to our schema, keeping script order
+            for position in sorted(tables_by_position):
+                schema.tables.extend(tables_by_position[position])
             
             # Merge constraints into the existing tables
-            if constraints_schema:
-                self._merge_constraints(schema, constraints_schema)
+            if constraints_future:
+                constraints_schema = constraints_future.result()
+                if constraints_schema:
+                    self._merge_constraints(schema, constraints_schema)
         
         return schema
     
-    def _extract_create_tables(self, sql_script: str) -> List[str]:
-        """Extract CREATE TABLE statements from a SQL script.
+    def _parse_table_deterministically(self, table_sql: str) -> Optional[Table]:
+        """Parse a CREATE TABLE statement without the LLM, if enabled and supported.
         
         Args:
-            sql_script: SQL CREATE script content
+            table_sql: CREATE TABLE statement
             
         Returns:
-            List of CREATE TABLE statements
+            The parsed table, or None if the statement needs the LLM
         """
-        # This is a simplified approach; in a real implementation we would use a more robust parser
-        # or leverage the LLM to identify and extract CREATE TABLE blocks
-        
-        # Split the script by common statement terminators
-        statements = []
-        current_statement = []
+        if not self.deterministic_parsing:
+            return None
+        try:
+            return parse_create_table(table_sql)
+        except SQLParseError as e:
+            self.logger.info("Falling back to LLM parsing: %s", e)
+            return None
+    
+    def _group_duplicate_tables(
+        self, 
+        tables_sql: List[str], 
+        positions: List[int],
+    ) -> Tuple[List[int], Dict[int, Tuple[str, str]]]:
+        """Find CREATE TABLE statements that are identical apart from the table name.
         
-        in_multiline_comment = False
-        in_string = False
+        Two statements count as copies when replacing each one's table name with
+        the same placeholder, everywhere it occurs, gives the same text.
         
-        for line in sql_script.splitlines():
-            # Skip empty lines
-            stripped_line = line.strip()
-            if not stripped_line:
-                continue
-                
-            # Handle comments and strings (simplified)
-            if "/*" in stripped_line and not in_string:
-                in_multiline_comment = True
-            if "*/" in stripped_line and not in_string:
-                in_multiline_comment = False
-                continue
-            if in_multiline_comment:
-                continue
-            if stripped_line.startswith("--"):
+        Args:
+            tables_sql: CREATE TABLE statements
+            positions: Positions in tables_sql of the statements to check, in order
+            
+        Returns:
+            The positions of the statements to parse, and a mapping from the position
+            of each copy to the names of its original and of the copy
+        """
+        unique_positions = []
+        copies: Dict[int, Tuple[str, str]] = {}
+        originals: Dict[str, Tuple[int, str]] = {}
+        for position in positions:
+            match = _CREATE_TABLE_NAME_RE.match(tables_sql[position])
+            name = match.group(1).strip('[]"') if match else None
+            if not name or not _WORD_RE.fullmatch(name):
+                unique_positions.append(position)
                 continue
-                
-            # Add the line to the current statement
-            current_statement.append(line)
-            
-            # Check if the statement is complete
-            if ";" in line:
-                statement = "\n".join(current_statement)
-                if "CREATE TABLE" in statement.upper():
-                    statements.append(statement)
-                current_statement = []
-                
-        # Check if there's an unfinished statement
-        if current_statement:
-            statement = "\n".join(current_statement)
-            if "CREATE TABLE" in statement.upper():
-                statements.append(statement)
-                
-        return statements
+            
+            key = tables_sql[position].replace(name, "\0")
+            if key in originals:
+                copies[position] = (originals[key][1], name)
+            else:
+                originals[key] = (position, name)
+                unique_positions.append(position)
+        
+        if copies:
+            self.logger.info(f"Reusing parsed tables for {len(copies)} duplicate table definitions")
+        return unique_positions, copies
     
-    def _extract_constraints(self, sql_script: str) -> str:
+    def _pack_table_batches(
+        self,
+        tables_sql: List[str],
+        positions: List[int],
+        chunk_size: int,
+        max_tokens: int,
+    ) -> List[List[int]]:
+        """Greedily group CREATE TABLE statements into batches that fit a single LLM call.
+        
+        A batch holds at most chunk_size characters of SQL, and its estimated
+        response (see _parse_token_budget) fits in max_tokens. A statement over
+        either limit gets a batch of its own.
+        
+        Args:
+            tables_sql: CREATE TABLE statements
+            positions: Positions in tables_sql of the statements to batch, in order
+            chunk_size: Maximum characters to process in a single LLM call
+            max_tokens: Maximum tokens to generate in the LLM response
+            
+        Returns:
+            Batches of positions in tables_sql
+        """
+        batches = []
+        batch: List[int] = []
+        batch_size = 0
+        batch_tokens = SCHEMA_PARSE_BASE_TOKENS
+        for position in positions:
+            size = len(tables_sql[position]) + len(_BATCH_SEPARATOR)
+            tokens = SCHEMA_PARSE_TOKENS_PER_DEFINITION * _count_definitions(tables_sql[position])
+            if batch and (batch_size + size > chunk_size or batch_tokens + tokens > max_tokens):
+                batches.append(batch)
+                batch, batch_size, batch_tokens = [], 0, SCHEMA_PARSE_BASE_TOKENS
+            batch.append(position)
+            batch_size += size
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def _parse_table_batch(self, tables_sql: List[str], schema_name: str, max_tokens: int) -> List[Table]:
+        """Parse a batch of CREATE TABLE statements with a single LLM call.
+        
+        If the response is missing any of the tables, each statement of the batch
+        is parsed on its own instead.
+        
+        Args:
+            tables_sql: CREATE TABLE statements
+            schema_name: Name to use for the schema
+            max_tokens: Maximum tokens to generate in the LLM response
+            
+        Returns:
+            The parsed tables
+        """
+        batch_schema = self._parse_with_llm(_BATCH_SEPARATOR.join(tables_sql), schema_name, max_tokens)
+        if batch_schema and len(batch_schema.tables) >= len(tables_sql):
+            return batch_schema.tables
+        if len(tables_sql) == 1:
+            return batch_schema.tables if batch_schema else []
+        
+        self.logger.warning(f"Batch of {len(tables_sql)} tables failed to parse, retrying table by table")
+        tables = []
+        for table_sql in tables_sql:
+            table_schema = self._parse_with_llm(table_sql, schema_name, max_tokens)
+            if table_schema:
+                tables.extend(table_schema.tables)
+        return tables
+    
+    def _extract_create_tables(self, sql_script: str, statements: Optional[List[str]] = None) -> List[str]:
+        """Extract CREATE TABLE statements from a SQL script.
+        
+        Args:
+            sql_script: SQL CREATE script content
+            statements: The script already split with split_statements, if available
+            
+        Returns:
+            List of CREATE TABLE statements
+        """
+        if statements is None:
+            statements = split_statements(sql_script)
+        # Search rather than match so a statement is still found after unterminated
+        # text such as a SET option, and drop that leading text
+        matches = (_CREATE_TABLE_RE.search(statement) for statement in statements)
+        return [m.string[m.start():] for m in matches if m]
+    
+    def _extract_constraints(self, sql_script: str, statements: Optional[List[str]] = None) -> str:
         """Extract ALTER TABLE statements with constraints from a SQL script.
         
         Args:
             sql_script: SQL CREATE script content
+            statements: The script already split with split_statements, if available
             
         Returns:
             SQL script with just the constraint definitions
         """
-        # Simplified extraction of ALTER TABLE statements that add constraints
-        constraints = []
-        
-        for line in sql_script.splitlines():
-            if "ALTER TABLE" in line.upper() and ("ADD CONSTRAINT" in line.upper() or "ADD FOREIGN KEY" in line.upper()):
-                constraints.append(line)
-                
-        return "\n".join(constraints)
+        if statements is None:
+            statements = split_statements(sql_script)
+        matches = (_ADD_CONSTRAINT_RE.search(statement) for statement in statements)
+        return "\n".join(m.string[m.start():] for m in matches if m)
     
     def _merge_constraints(self, schema: Schema, constraints_schema: Schema) -> None:
         """Merge constraints from constraints_schema into the main schema.
@@ -397,19 +781,28 @@ class SchemaParseAgent(Agent):
         if not constraints_schema or not constraints_schema.tables:
             return
             
+        # Index the main schema's tables by name, keeping the first match
+        tables_by_name = {}
+        for table in schema.tables:
+            tables_by_name.setdefault(table.name, table)
+        
         for constraints_table in constraints_schema.tables:
             # Find the matching table in the main schema
-            main_table = next((t for t in schema.tables if t.name == constraints_table.name), None)
+            main_table = tables_by_name.get(constraints_table.name)
             if main_table:
                 # Add foreign keys
+                fk_names = {existing.name for existing in main_table.foreign_keys}
                 for fk in constraints_table.foreign_keys:
-                    if not any(existing.name == fk.name for existing in main_table.foreign_keys):
+                    if fk.name not in fk_names:
                         main_table.foreign_keys.append(fk)
+                        fk_names.add(fk.name)
                 
                 # Add check constraints
+                ck_names = {existing.name for existing in main_table.check_constraints}
                 for ck in constraints_table.check_constraints:
-                    if not any(existing.name == ck.name for existing in main_table.check_constraints):
+                    if ck.name not in ck_names:
                         main_table.check_constraints.append(ck)
+                        ck_names.add(ck.name)
     
     def _create_parse_prompt(self, sql_script: str, schema_name: str) -> str:
         """Create a prompt for parsing SQL to Schema.
@@ -436,86 +829,9 @@ class SchemaParseAgent(Agent):
             schema_name: Name to use for the schema
             
         Returns:
-            JSON schema template
+            JSON schema template (shared module constant, not to be mutated)
         """
-        return {
-            "type": "object",
-            "properties": {
-                "name": {"type": "string", "description": "Name of the schema"},
-                "description": {"type": "string", "description": "Description of the schema"},
-                "tables": {
-                    "type": "array",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "name": {"type": "string", "description": "Name of the table"},
-                            "description": {"type": "string", "description": "Description of the table"},
-                            "columns": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "name": {"type": "string", "description": "Name of the column"},
-                                        "data_type": {
-                                            "type": "object",
-                                            "properties": {
-                                                "name": {"type": "string", "description": "SQL Server data type name"},
-                                                "length": {"type": ["integer", "null"], "description": "Length for string types"},
-                                                "precision": {"type": ["integer", "null"], "description": "Precision for numeric types"},
-                                                "scale": {"type": ["integer", "null"], "description": "Scale for numeric types"},
-                                            },
-                                            "required": ["name"]
-                                        },
-                                        "nullable": {"type": "boolean", "description": "Whether the column can be NULL"},
-                                        "default_value": {"type": ["string", "null"], "description": "Default value for the column, if any"},
-                                        "is_identity": {"type": "boolean", "description": "Whether the column is an identity column"},
-                                        "description": {"type": "string", "description": "Description of the column"}
-                                    },
-                                    "required": ["name", "data_type", "nullable"]
-                                }
-                            },
-                            "primary_key": {
-                                "type": ["object", "null"],
-                                "properties": {
-                                    "name": {"type": "string", "description": "Name of the primary key constraint"},
-                                    "columns": {"type": "array", "items": {"type": "string"}, "description": "Columns in the primary key"},
-                                },
-                                "required": ["name", "columns"]
-                            },
-                            "foreign_keys": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "name": {"type": "string", "description": "Name of the foreign key constraint"},
-                                        "columns": {"type": "array", "items": {"type": "string"}, "description": "Columns in the foreign key"},
-                                        "ref_table": {"type": "string", "description": "Referenced table"},
-                                        "ref_columns": {"type": "array", "items": {"type": "string"}, "description": "Referenced columns"},
-                                        "on_delete": {"type": "string", "description": "ON DELETE action"},
-                                        "on_update": {"type": "string", "description": "ON UPDATE action"},
-                                    },
-                                    "required": ["name", "columns", "ref_table", "ref_columns"]
-                                }
-                            },
-                            "check_constraints": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "name": {"type": "string", "description": "Name of the check constraint"},
-                                        "definition": {"type": "string", "description": "SQL definition of the constraint"},
-                                    },
-                                    "required": ["name", "definition"]
-                                }
-                            },
-                            "is_reference_table": {"type": "boolean", "description": "Whether this is a reference/lookup table"}
-                        },
-                        "required": ["name", "columns"]
-                    }
-                }
-            },
-            "required": ["name", "tables"]
-        }
+        return _SCHEMA_TEMPLATE
     
     def retry_llm_call(self) -> Optional[Schema]:
         """Retry the last LLM call.
@@ -523,14 +839,16 @@ class SchemaParseAgent(Agent):
         Returns:
             A Schema object representing the Intermediate Representation
         """
-        if not self._last_prompt or not self._last_schema_template:
+        last_prompt = getattr(self._local, "last_prompt", None)
+        last_schema_template = getattr(self._local, "last_schema_template", None)
+        if not last_prompt or not last_schema_template:
             self.logger.error("No previous LLM call to retry")
             return None
             
         try:
             schema_json = self.provider.generate_json(
-                self._last_prompt,
-                self._last_schema_template,
+                last_prompt,
+                last_schema_template,
                 temperature=0.0,
                 seed=self.seed,
                 model=self.llm_model
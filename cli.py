@@ -8,6 +8,7 @@ allowing users to generate synthetic data for SQL Server schemas.
 
 import argparse
 import json
+import logging
 import random
 import sys
 from pathlib import Path
@@ -16,6 +17,22 @@ from typing import Optional
 from orchestrator import Orchestrator
 
 
+class _AgentLogFormatter(logging.Formatter):
+    """Format log records as "[LEVEL] Owner: message", like the original print-based agent output."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        # Agent loggers are children of their module logger; show just the agent name
+        record.owner = record.name.rsplit('.', 1)[-1]
+        return super().format(record)
+
+
+def configure_logging() -> None:
+    """Send INFO and higher log records to stdout, where agent progress used to be printed."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_AgentLogFormatter("[%(levelname)s] %(owner)s: %(message)s"))
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+
+
 def parse_args():
     """Parse command-line arguments.
     
@@ -45,7 +62,8 @@ def parse_args():
     parser.add_argument(
         "--artifacts-dir", "-a",
         default="artifacts",
-        help="Directory to store artifacts and output files"
+        help="Directory to store artifacts and output files; LLM responses are "
+             "cached across runs in its llm_cache subdirectory"
     )
     
     parser.add_argument(
@@ -56,7 +74,8 @@ def parse_args():
     parser.add_argument(
         "--seed", "-s",
         type=int,
-        help="Random seed for reproducible generation"
+        help="Random seed for reproducible generation; runs with the same seed "
+             "reuse cached LLM responses"
     )
     
     parser.add_argument(
@@ -75,6 +94,7 @@ def main() -> int:
         Exit code (0 for success, non-zero for failure)
     """
     args = parse_args()
+    configure_logging()
     
     # Validate input paths
     sql_script_path = Path(args.sql_script)
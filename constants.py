@@ -76,4 +76,11 @@ SQL_TYPE_MAPPING = {
 }
 
 # Maximum chunk size for parsing large SQL scripts
-MAX_SQL_CHUNK_SIZE = 32000  # In characters 
\ No newline at end of file
+MAX_SQL_CHUNK_SIZE = 32000  # In characters 
+
+# Output token budget for a single schema parse call, sized from the number of
+# column and constraint definitions in the SQL it parses and capped by the caller's
+# max_tokens. Each definition becomes a JSON object of roughly 50-70 tokens.
+SCHEMA_PARSE_BASE_TOKENS = 200
+SCHEMA_PARSE_TOKENS_PER_DEFINITION = 80
+MIN_SCHEMA_PARSE_TOKENS = 512
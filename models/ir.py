@@ -7,16 +7,21 @@ in the pipeline.
 """
 
 from dataclasses import dataclass, field
-from enum import Enum, auto
+from enum import IntEnum, auto
+from functools import lru_cache
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 from constants import IR_SCHEMA_VERSION
 
 
-class ColumnType(Enum):
-    """SQL Server column data types."""
+class ColumnType(IntEnum):
+    """SQL Server column data types.
+    
+    An IntEnum so that the equality and hash checks behind the Column.is_*
+    properties run on plain ints. Serialized forms always use the member name.
+    """
     INTEGER = auto()
     BIGINT = auto()
     SMALLINT = auto()
@@ -46,58 +51,139 @@ class ColumnType(Enum):
     IMAGE = auto()
     JSON = auto()
     UNKNOWN = auto()
-
+    
     @classmethod
+    @lru_cache(maxsize=256)
     def from_sql_type(cls, sql_type: str) -> 'ColumnType':
         """Convert SQL type string to ColumnType.
         
+        Results are cached per raw type string, since schemas repeat a handful
+        of types (e.g. 'INT', 'NVARCHAR(50)') across many columns.
+        
         Args:
             sql_type: SQL type string (e.g., 'INT', 'NVARCHAR')
         
         Returns:
             Corresponding ColumnType
         """
-        type_map = {
-            'INT': cls.INTEGER,
-            'INTEGER': cls.INTEGER,
-            'BIGINT': cls.BIGINT,
-            'SMALLINT': cls.SMALLINT,
-            'TINYINT': cls.TINYINT,
-            'DECIMAL': cls.DECIMAL,
-            'NUMERIC': cls.NUMERIC,
-            'FLOAT': cls.FLOAT,
-            'REAL': cls.REAL,
-            'MONEY': cls.MONEY,
-            'SMALLMONEY': cls.MONEY,
-            'BIT': cls.BIT,
-            'CHAR': cls.CHAR,
-            'VARCHAR': cls.VARCHAR,
-            'TEXT': cls.TEXT,
-            'NCHAR': cls.NCHAR,
-            'NVARCHAR': cls.NVARCHAR,
-            'NTEXT': cls.NTEXT,
-            'DATE': cls.DATE,
-            'DATETIME': cls.DATETIME,
-            'DATETIME2': cls.DATETIME2,
-            'SMALLDATETIME': cls.SMALLDATETIME,
-            'TIME': cls.TIME,
-            'DATETIMEOFFSET': cls.DATETIMEOFFSET,
-            'UNIQUEIDENTIFIER': cls.UNIQUEIDENTIFIER,
-            'XML': cls.XML,
-            'BINARY': cls.BINARY,
-            'VARBINARY': cls.VARBINARY,
-            'IMAGE': cls.IMAGE,
-            'JSON': cls.JSON,
-        }
-        
         # Remove parentheses and parameters from type
         # e.g., 'NVARCHAR(50)' -> 'NVARCHAR'
-        sql_type = sql_type.split('(')[0].strip().upper()
-        
-        return type_map.get(sql_type, cls.UNKNOWN)
+        return _SQL_TYPE_INDEX.get(sql_type.split('(', 1)[0].strip().upper(), cls.UNKNOWN)
+
+
+# Base SQL type name (upper case, without parameters) -> ColumnType, built once at import
+_SQL_TYPE_INDEX: Dict[str, ColumnType] = {
+    'INT': ColumnType.INTEGER,
+    'INTEGER': ColumnType.INTEGER,
+    'BIGINT': ColumnType.BIGINT,
+    'SMALLINT': ColumnType.SMALLINT,
+    'TINYINT': ColumnType.TINYINT,
+    'DECIMAL': ColumnType.DECIMAL,
+    'NUMERIC': ColumnType.NUMERIC,
+    'FLOAT': ColumnType.FLOAT,
+    'REAL': ColumnType.REAL,
+    'MONEY': ColumnType.MONEY,
+    'SMALLMONEY': ColumnType.MONEY,
+    'BIT': ColumnType.BIT,
+    'CHAR': ColumnType.CHAR,
+    'VARCHAR': ColumnType.VARCHAR,
+    'TEXT': ColumnType.TEXT,
+    'NCHAR': ColumnType.NCHAR,
+    'NVARCHAR': ColumnType.NVARCHAR,
+    'NTEXT': ColumnType.NTEXT,
+    'DATE': ColumnType.DATE,
+    'DATETIME': ColumnType.DATETIME,
+    'DATETIME2': ColumnType.DATETIME2,
+    'SMALLDATETIME': ColumnType.SMALLDATETIME,
+    'TIME': ColumnType.TIME,
+    'DATETIMEOFFSET': ColumnType.DATETIMEOFFSET,
+    'UNIQUEIDENTIFIER': ColumnType.UNIQUEIDENTIFIER,
+    'XML': ColumnType.XML,
+    'BINARY': ColumnType.BINARY,
+    'VARBINARY': ColumnType.VARBINARY,
+    'IMAGE': ColumnType.IMAGE,
+    'JSON': ColumnType.JSON,
+}
+
+
+def _compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop None values from a to_dict() result; from_dict defaults them back to None."""
+    return {key: value for key, value in data.items() if value is not None}
+
+
+# ColumnType member name -> ColumnType, for decoding serialized columns without
+# going through EnumMeta.__getitem__
+_COLUMN_TYPES_BY_NAME: Dict[str, ColumnType] = {column_type.name: column_type for column_type in ColumnType}
+
+# Positions of named IR objects by lowercase name, with the list and length it was built from
+_NameIndex = Tuple[List[Any], int, Dict[str, int]]
+
+
+def _name_index(items: List[Any], cached: Optional[_NameIndex]) -> _NameIndex:
+    """Get the positions of items by lowercase name, keeping the first match for each name.
+    
+    The cached index is reused while it was built from the same list object at
+    the same length, so appending or replacing the list invalidates it.
+    """
+    if cached is not None and cached[0] is items and cached[1] == len(items):
+        return cached
+    index: Dict[str, int] = {}
+    for position, item in enumerate(items):
+        index.setdefault(item.name.lower(), position)
+    return items, len(items), index
+
+
+def _find_by_name(items: List[Any], index: _NameIndex, name: str) -> Optional[Any]:
+    """Look up an item by case-insensitive name, verifying the index hit.
+    
+    The hit is read from the list at the indexed position, so an item replaced
+    in place is found rather than the discarded one. When the item there no
+    longer has the name (renamed, or the list reordered or edited in place),
+    falls back to a linear scan.
+    """
+    key = name.lower()
+    position = index[2].get(key)
+    if position is not None and position < len(items):
+        item = items[position]
+        if item.name.lower() == key:
+            return item
+    for item in items:
+        if item.name.lower() == key:
+            return item
+    return None
+
+
+# Column type categories used by the Column.is_* properties
+_NUMERIC_TYPES = frozenset({
+    ColumnType.INTEGER,
+    ColumnType.BIGINT,
+    ColumnType.SMALLINT,
+    ColumnType.TINYINT,
+    ColumnType.DECIMAL,
+    ColumnType.NUMERIC,
+    ColumnType.FLOAT,
+    ColumnType.REAL,
+    ColumnType.MONEY,
+})
+_STRING_TYPES = frozenset({
+    ColumnType.CHAR,
+    ColumnType.VARCHAR,
+    ColumnType.TEXT,
+    ColumnType.NCHAR,
+    ColumnType.NVARCHAR,
+    ColumnType.NTEXT,
+})
+_DATETIME_TYPES = frozenset({
+    ColumnType.DATE,
+    ColumnType.DATETIME,
+    ColumnType.DATETIME2,
+    ColumnType.SMALLDATETIME,
+    ColumnType.TIME,
+    ColumnType.DATETIMEOFFSET,
+})
 
 
-@dataclass
+@dataclass(slots=True)
 class Column:
     """Represents a column in a SQL Server table."""
     name: str
@@ -114,44 +200,17 @@ class Column:
     @property
     def is_numeric(self) -> bool:
         """Check if column is a numeric type."""
-        numeric_types = {
-            ColumnType.INTEGER,
-            ColumnType.BIGINT,
-            ColumnType.SMALLINT,
-            ColumnType.TINYINT,
-            ColumnType.DECIMAL,
-            ColumnType.NUMERIC,
-            ColumnType.FLOAT,
-            ColumnType.REAL,
-            ColumnType.MONEY,
-        }
-        return self.data_type in numeric_types
+        return self.data_type in _NUMERIC_TYPES
     
     @property
     def is_string(self) -> bool:
         """Check if column is a string type."""
-        string_types = {
-            ColumnType.CHAR,
-            ColumnType.VARCHAR,
-            ColumnType.TEXT,
-            ColumnType.NCHAR,
-            ColumnType.NVARCHAR,
-            ColumnType.NTEXT,
-        }
-        return self.data_type in string_types
+        return self.data_type in _STRING_TYPES
     
     @property
     def is_datetime(self) -> bool:
         """Check if column is a datetime type."""
-        datetime_types = {
-            ColumnType.DATE,
-            ColumnType.DATETIME,
-            ColumnType.DATETIME2,
-            ColumnType.SMALLDATETIME,
-            ColumnType.TIME,
-            ColumnType.DATETIMEOFFSET,
-        }
-        return self.data_type in datetime_types
+        return self.data_type in _DATETIME_TYPES
     
     @property
     def is_boolean(self) -> bool:
@@ -164,7 +223,7 @@ class Column:
         Returns:
             Dictionary representation of the column
         """
-        return {
+        return _compact({
             "name": self.name,
             "data_type": self.data_type.name,
             "nullable": self.nullable,
@@ -175,7 +234,7 @@ class Column:
             "is_identity": self.is_identity,
             "is_computed": self.is_computed,
             "description": self.description,
-        }
+        })
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Column':
@@ -189,7 +248,7 @@ class Column:
         """
         return cls(
             name=data["name"],
-            data_type=ColumnType[data["data_type"]],
+            data_type=_COLUMN_TYPES_BY_NAME[data["data_type"]],
             nullable=data.get("nullable", True),
             length=data.get("length"),
             precision=data.get("precision"),
@@ -201,7 +260,7 @@ class Column:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class PrimaryKey:
     """Represents a primary key constraint in a SQL Server table."""
     name: str
@@ -223,7 +282,7 @@ class PrimaryKey:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ForeignKey:
     """Represents a foreign key constraint in a SQL Server table."""
     name: str
@@ -235,14 +294,14 @@ class ForeignKey:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary representation."""
-        return {
+        return _compact({
             "name": self.name,
             "columns": self.columns,
             "ref_table": self.ref_table,
             "ref_columns": self.ref_columns,
             "on_delete": self.on_delete,
             "on_update": self.on_update,
-        }
+        })
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ForeignKey':
@@ -257,7 +316,7 @@ class ForeignKey:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Index:
     """Represents an index in a SQL Server table."""
     name: str
@@ -285,7 +344,7 @@ class Index:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class CheckConstraint:
     """Represents a CHECK constraint in a SQL Server table."""
     name: str
@@ -307,7 +366,7 @@ class CheckConstraint:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class UniqueConstraint:
     """Represents a UNIQUE constraint in a SQL Server table."""
     name: str
@@ -329,7 +388,7 @@ class UniqueConstraint:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class DefaultConstraint:
     """Represents a DEFAULT constraint in a SQL Server table."""
     name: str
@@ -354,7 +413,7 @@ class DefaultConstraint:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ReferenceData:
     """Represents reference data for a table."""
     rows: List[Dict[str, Any]]
@@ -391,32 +450,31 @@ class ReferenceData:
         Returns:
             Dictionary mapping row indices to normalized weights
         """
-        weights = {}
-        
-        # Check if rows have weight attribute
-        has_weights = any("weight" in row for row in self.rows)
-        
-        if has_weights:
-            # Extract weights from rows
-            total_weight = 0.0
-            for i, row in enumerate(self.rows):
-                weight = float(row.get("weight", 1.0))
-                weights[i] = weight
-                total_weight += weight
-                
-            # Normalize weights
-            if total_weight > 0:
-                for i in weights:
-                    weights[i] /= total_weight
-        else:
-            # Equal weights if none specified
+        # Equal weights if none specified
+        if not any("weight" in row for row in self.rows):
             equal_weight = 1.0 / len(self.rows) if self.rows else 0.0
-            weights = {i: equal_weight for i in range(len(self.rows))}
+            return dict.fromkeys(range(len(self.rows)), equal_weight)
         
-        return weights
+        # Extract weights from rows and normalize them
+        weights = [float(row.get("weight", 1.0)) for row in self.rows]
+        total_weight = sum(weights)
+        if total_weight > 0:
+            return {i: weight / total_weight for i, weight in enumerate(weights)}
+        return dict(enumerate(weights))
+
 
+# Name fragments that suggest a lookup/reference table
+_REFERENCE_INDICATORS = ("lookup", "reference", "type", "status", "code")
 
-@dataclass
+
+@lru_cache(maxsize=1024)
+def _has_reference_name(table_name: str) -> bool:
+    """Check whether a table name contains a reference table indicator."""
+    name_lower = table_name.lower()
+    return any(indicator in name_lower for indicator in _REFERENCE_INDICATORS)
+
+
+@dataclass(slots=True)
 class Table:
     """Represents a table in a SQL Server database."""
     name: str
@@ -429,6 +487,7 @@ class Table:
     default_constraints: List[DefaultConstraint] = field(default_factory=list)
     reference_data: Optional[ReferenceData] = None
     description: Optional[str] = None
+    _column_index: Optional[_NameIndex] = field(default=None, init=False, repr=False, compare=False)
     
     def get_column(self, name: str) -> Optional[Column]:
         """Get a column by name.
@@ -439,10 +498,8 @@ class Table:
         Returns:
             Column object or None if not found
         """
-        for column in self.columns:
-            if column.name.lower() == name.lower():
-                return column
-        return None
+        self._column_index = _name_index(self.columns, self._column_index)
+        return _find_by_name(self.columns, self._column_index, name)
     
     @property
     def is_reference_table(self) -> bool:
@@ -459,13 +516,10 @@ class Table:
         if self.reference_data is not None and hasattr(self.reference_data, 'rows') and len(self.reference_data.rows) > 0:
             return True
         
-        # If the table name clearly indicates it's a reference table
-        name_lower = self.name.lower()
-        reference_indicators = ["lookup", "reference", "type", "status", "code"]
-        if any(indicator in name_lower for indicator in reference_indicators):
-            # But only if it's a small table with a primary key
-            if len(self.columns) <= 5 and self.primary_key is not None:
-                return True
+        # If the table name clearly indicates it's a reference table,
+        # but only if it's a small table with a primary key
+        if len(self.columns) <= 5 and self.primary_key is not None and _has_reference_name(self.name):
+            return True
         
         # If it has few columns and many foreign keys reference it, it's likely a reference table
         # This would require checking across all tables, which we don't have context for here
@@ -475,7 +529,7 @@ class Table:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary representation."""
-        return {
+        return _compact({
             "name": self.name,
             "columns": [col.to_dict() for col in self.columns],
             "primary_key": self.primary_key.to_dict() if self.primary_key else None,
@@ -486,7 +540,7 @@ class Table:
             "default_constraints": [dc.to_dict() for dc in self.default_constraints],
             "reference_data": self.reference_data.to_dict() if self.reference_data else None,
             "description": self.description,
-        }
+        })
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Table':
@@ -505,7 +559,7 @@ class Table:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class GenerationRule:
     """Represents a rule for synthetic data generation."""
     rule_id: str
@@ -516,13 +570,13 @@ class GenerationRule:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary representation."""
-        return {
+        return _compact({
             "rule_id": self.rule_id,
             "rule_type": self.rule_type,
             "target": self.target,
             "definition": self.definition,
             "description": self.description,
-        }
+        })
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'GenerationRule':
@@ -536,7 +590,7 @@ class GenerationRule:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Schema:
     """Represents a complete SQL Server schema."""
     name: str
@@ -544,6 +598,7 @@ class Schema:
     generation_rules: List[GenerationRule] = field(default_factory=list)
     ir_version: str = IR_SCHEMA_VERSION
     description: Optional[str] = None
+    _table_index: Optional[_NameIndex] = field(default=None, init=False, repr=False, compare=False)
     
     def get_table(self, name: str) -> Optional[Table]:
         """Get a table by name.
@@ -554,10 +609,8 @@ class Schema:
         Returns:
             Table object or None if not found
         """
-        for table in self.tables:
-            if table.name.lower() == name.lower():
-                return table
-        return None
+        self._table_index = _name_index(self.tables, self._table_index)
+        return _find_by_name(self.tables, self._table_index, name)
     
     def get_reference_tables(self) -> List[Table]:
         """Get all reference tables in the schema.
@@ -577,13 +630,13 @@ class Schema:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary representation."""
-        return {
+        return _compact({
             "name": self.name,
             "tables": [table.to_dict() for table in self.tables],
             "generation_rules": [rule.to_dict() for rule in self.generation_rules],
             "ir_version": self.ir_version,
             "description": self.description,
-        }
+        })
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Schema':
@@ -605,7 +658,7 @@ class Schema:
         Returns:
             JSON string representation
         """
-        return json.dumps(self.to_dict(), indent=indent)
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
     
     @classmethod
     def from_json(cls, json_str: str) -> 'Schema':
@@ -627,8 +680,9 @@ class Schema:
             file_path: Path to save the file
             indent: Number of spaces for indentation
         """
-        with open(file_path, 'w') as f:
-            f.write(self.to_json(indent=indent))
+        # Stream the JSON to the file instead of building the whole string first
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=indent, ensure_ascii=False)
     
     @classmethod
     def load_from_file(cls, file_path: Union[str, Path]) -> 'Schema':
@@ -640,5 +694,5 @@ class Schema:
         Returns:
             Schema instance
         """
-        with open(file_path, 'r') as f:
-            return cls.from_json(f.read()) 
\ No newline at end of file
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f)) 
\ No newline at end of file
@@ -27,6 +27,29 @@ from typing import Any, Dict, List, Optional, Type, Union
 from agents.base import Agent
 
 
+class _SimpleLogger:
+    """Minimal print-based logger that prefixes messages with level and owner name.
+    
+    Placeholder until the orchestrator is wired to the logging module like the agents.
+    """
+    
+    __slots__ = ("_info_pfx", "_warn_pfx", "_err_pfx")
+    
+    def __init__(self, name: str):
+        self._info_pfx = f"[INFO] {name}: "
+        self._warn_pfx = f"[WARNING] {name}: "
+        self._err_pfx = f"[ERROR] {name}: "
+    
+    def info(self, msg: str) -> None:
+        print(self._info_pfx + msg)
+    
+    def warning(self, msg: str) -> None:
+        print(self._warn_pfx + msg)
+    
+    def error(self, msg: str) -> None:
+        print(self._err_pfx + msg)
+
+
 class Orchestrator:
     """Orchestrator for the SynthGen agent pipeline.
     
@@ -85,13 +108,7 @@ class Orchestrator:
     
     def _setup_logging(self) -> None:
         """Set up logging for the orchestrator."""
-        # Placeholder for logging setup
-        # In a real implementation, this would configure a proper logger
-        self.logger = type('SimpleLogger', (), {
-            'info': lambda msg: print(f"[INFO] Orchestrator: {msg}"),
-            'error': lambda msg: print(f"[ERROR] Orchestrator: {msg}"),
-            'warning': lambda msg: print(f"[WARNING] Orchestrator: {msg}"),
-        })()
+        self.logger = _SimpleLogger("Orchestrator")
     
     def run(self) -> Dict[str, Any]:
         """Run the complete SynthGen pipeline.
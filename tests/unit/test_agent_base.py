@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the agent base class.
+
+This module tests that artifacts are written atomically and tracked until
+flush_artifacts syncs them.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+from agents.base import Agent
+
+
+class StubAgent(Agent):
+    """Minimal concrete agent for exercising the base class."""
+    
+    def retry_llm_call(self):
+        raise RuntimeError("No previous LLM call to retry")
+    
+    def run(self, *args, **kwargs):
+        return None
+
+
+class TestArtifactWrites(unittest.TestCase):
+    """Tests for _write_artifact_file and flush_artifacts."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.agent = StubAgent(name="Stub", run_id="test", artifacts_dir=self.temp_dir.name)
+    
+    def test_write_and_flush_round_trip(self):
+        """Test that written artifacts read back, leave no temp files and are synced once."""
+        file_path = self.agent._ensure_dir("traces") / "artifact.md"
+        self.agent._write_artifact_file(file_path, "first".encode("utf-8"))
+        self.agent._write_artifact_file(file_path, "überschrieben".encode("utf-8"))
+        
+        self.assertEqual(file_path.read_text(encoding="utf-8"), "überschrieben")
+        self.assertEqual([p.name for p in file_path.parent.iterdir()], ["artifact.md"])
+        self.assertEqual(self.agent._dirty_files, {file_path})
+        
+        with mock.patch("agents.base.os.fsync") as fsync:
+            self.agent.flush_artifacts()
+            # One sync for the file and one for its directory
+            self.assertEqual(fsync.call_count, 2)
+            
+            fsync.reset_mock()
+            self.agent.flush_artifacts()
+            fsync.assert_not_called()
+        
+        self.assertEqual(self.agent._dirty_files, set())
+        self.assertEqual(file_path.read_text(encoding="utf-8"), "überschrieben")
+    
+    def test_save_artifact_json(self):
+        """Test that dict artifacts are saved as sorted, pretty-printed JSON."""
+        file_path = self.agent.save_artifact("meta", {"b": 1, "a": "x"}, artifact_type="logs", is_json=True)
+        
+        self.assertEqual(file_path, Path(self.temp_dir.name) / "test" / "logs" / "meta.json")
+        self.assertEqual(file_path.read_text(encoding="utf-8"), '{\n  "a": "x",\n  "b": 1\n}')
+        self.assertIn(file_path, self.agent._dirty_files)
+
+
+if __name__ == "__main__":
+    unittest.main()
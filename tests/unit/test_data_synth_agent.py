@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the data synthesis agent.
+
+This module tests decoding of streamed LLM responses into rows, including the
+fallback to the lenient parser when the streamed array is malformed, batched
+generation of several tables in one call, and the table generation order.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+from agents.data_synth_agent import DataSynthAgent, _decode_streamed_rows, _iter_streamed_rows
+from models.ir import Column, ColumnType, ForeignKey, ReferenceData, Schema, Table
+
+
+class FakeProvider:
+    """LLM provider that streams a canned response."""
+    
+    def __init__(self, response: str):
+        self.response = response
+    
+    def generate(self, prompt, **kwargs):
+        return self.response
+    
+    def generate_stream(self, prompt, **kwargs):
+        # Split the response so elements arrive across several chunks
+        for i in range(0, len(self.response), 7):
+            yield self.response[i:i + 7]
+
+
+def make_table(name, *references, **kwargs):
+    """Create a table with an ID column and a foreign key to each referenced table."""
+    return Table(
+        name=name,
+        columns=[Column(name="ID", data_type=ColumnType.INTEGER)],
+        foreign_keys=[
+            ForeignKey(name=f"FK_{name}_{ref}", columns=["ID"], ref_table=ref, ref_columns=["ID"])
+            for ref in references
+        ],
+        **kwargs
+    )
+
+
+def make_agent(temp_dir, response=""):
+    """Create a DataSynthAgent whose LLM provider returns a canned response."""
+    with mock.patch("agents.data_synth_agent.get_provider", lambda name: FakeProvider(response)):
+        return DataSynthAgent(run_id="test", artifacts_dir=temp_dir, llm_cache=False)
+
+
+class TestStreamedRows(unittest.TestCase):
+    """Tests for decoding streamed JSON arrays."""
+    
+    def test_rows_yielded_before_stream_ends(self):
+        """Test that each element is yielded as soon as it is complete."""
+        consumed = []
+        
+        def chunks():
+            for chunk in ['[{"a": 1}', ', {"a"', ': 2}', "]"]:
+                consumed.append(chunk)
+                yield chunk
+        
+        rows = _iter_streamed_rows(chunks())
+        self.assertEqual(next(rows), {"a": 1})
+        self.assertEqual(len(consumed), 1)
+        self.assertEqual(next(rows), {"a": 2})
+        with self.assertRaises(StopIteration) as stop:
+            next(rows)
+        self.assertIs(stop.exception.value, True)
+    
+    def test_complete_array(self):
+        """Test that a well-formed array in a code fence decodes completely."""
+        rows, complete = _decode_streamed_rows(['```json\n[{"a": 1},', ' {"a": 2}]\n```'])
+        
+        self.assertTrue(complete)
+        self.assertEqual(rows, [{"a": 1}, {"a": 2}])
+    
+    def test_malformed_middle_element(self):
+        """Test that decoding stops at a malformed element and reports it."""
+        rows, complete = _decode_streamed_rows(['[{"a":1},{a:2},{"a":3}]'])
+        
+        self.assertFalse(complete)
+        self.assertEqual(rows, [{"a": 1}])
+    
+    def test_truncated_array(self):
+        """Test that a response cut off mid-array is reported as incomplete."""
+        rows, complete = _decode_streamed_rows(['[{"a": 1}, {"a"'])
+        
+        self.assertFalse(complete)
+        self.assertEqual(rows, [{"a": 1}])
+
+
+class TestLLMGenerateData(unittest.TestCase):
+    """Tests for DataSynthAgent._llm_generate_data."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.table = Table(name="Items", columns=[Column(name="a", data_type=ColumnType.INTEGER)])
+        self.schema = Schema(name="Test", tables=[self.table])
+    
+    def _generate(self, response: str, **kwargs):
+        kwargs.setdefault("llm_cache", False)
+        with mock.patch("agents.data_synth_agent.get_provider", lambda name: FakeProvider(response)):
+            agent = DataSynthAgent(run_id="test", artifacts_dir=self.temp_dir.name, **kwargs)
+        return agent._llm_generate_data(self.schema, self.table, 3)
+    
+    def _cached_responses(self):
+        return list((Path(self.temp_dir.name) / "llm_cache").glob("*.txt"))
+    
+    def test_streamed_rows(self):
+        """Test that a well-formed streamed response is used directly."""
+        rows = self._generate('[{"a": 1}, {"a": 2}, {"a": 3}]')
+        
+        self.assertEqual([row["a"] for row in rows], [1, 2, 3])
+    
+    def test_malformed_middle_element_falls_back_to_repair(self):
+        """Test that rows after a malformed element are recovered by the full parse."""
+        rows = self._generate('[{"a":1},{a:2},{"a":3}]')
+        
+        self.assertEqual([row["a"] for row in rows], [1, 2, 3])
+    
+    def test_parsed_response_is_cached(self):
+        """Test that a seeded run caches a response once its rows parse."""
+        self._generate('[{"a": 1}]', seed=1, llm_cache=True)
+        
+        self.assertEqual(len(self._cached_responses()), 1)
+    
+    def test_unparseable_response_is_not_cached(self):
+        """Test that a response that only produces fallback rows isn't cached."""
+        rows = self._generate("Sorry, I can't help with that.", seed=1, llm_cache=True)
+        
+        self.assertTrue(rows)
+        self.assertEqual(self._cached_responses(), [])
+
+
+
+class FlakyProvider(FakeProvider):
+    """LLM provider whose first call fails."""
+    
+    def __init__(self, response: str):
+        super().__init__(response)
+        self.calls = 0
+    
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("Connection reset")
+        return f"{self.response} {self.calls}"
+
+
+class TestLLMCacheKeys(unittest.TestCase):
+    """Tests for the LLM cache keys of repeated and retried requests."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+    
+    def _agent(self, provider):
+        with mock.patch("agents.data_synth_agent.get_provider", lambda name: provider):
+            return DataSynthAgent(run_id="test", artifacts_dir=self.temp_dir.name, seed=1)
+    
+    def test_retry_reuses_cache_key(self):
+        """Test that a retried request is cached under its own key, not the next one's."""
+        agent = self._agent(FlakyProvider("[]"))
+        with self.assertRaises(ConnectionError):
+            agent.llm_call("prompt")
+        self.assertEqual(agent.retry_llm_call(), "[] 2")
+        agent._commit_cached_response()
+        self.assertEqual(agent.llm_call("prompt"), "[] 3")
+        agent._commit_cached_response()
+        
+        # A new run replays both requests from the cache, in order
+        provider = FlakyProvider("[]")
+        agent = self._agent(provider)
+        self.assertEqual([agent.llm_call("prompt"), agent.llm_call("prompt")], ["[] 2", "[] 3"])
+        self.assertEqual(provider.calls, 0)
+
+
+class TestLLMGenerateBatch(unittest.TestCase):
+    """Tests for DataSynthAgent._llm_generate_batch."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.tables = [make_table("Status"), make_table("Region")]
+        self.schema = Schema(name="Test", tables=self.tables)
+    
+    def test_rows_matched_to_tables(self):
+        """Test that one response is split by table name, case-insensitively."""
+        agent = make_agent(
+            self.temp_dir.name,
+            '```json\n{"status": [{"ID": "1"}, {"ID": "2"}], "Region": [{"ID": 7}]}\n```'
+        )
+        
+        generated = agent._llm_generate_batch(self.schema, self.tables, {"Status": 2, "Region": 1})
+        
+        self.assertEqual(generated, {"Status": [{"ID": 1}, {"ID": 2}], "Region": [{"ID": 7}]})
+    
+    def test_missing_and_malformed_tables_omitted(self):
+        """Test that tables the response leaves out or garbles are omitted."""
+        agent = make_agent(self.temp_dir.name, '{"Status": "none", "Other": []}')
+        
+        self.assertEqual(agent._llm_generate_batch(self.schema, self.tables, {}), {})
+
+
+class TestGenerationOrder(unittest.TestCase):
+    """Tests for DataSynthAgent._determine_generation_order."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.agent = make_agent(self.temp_dir.name)
+    
+    def test_dependencies_first(self):
+        """Test that reference tables come first and tables follow what they reference."""
+        schema = Schema(name="Test", tables=[
+            make_table("OrderLine", "Order", "Product"),
+            make_table("Order", "Customer", "Status"),
+            make_table("Product"),
+            make_table("Customer", "Customer"),
+            make_table("Status", reference_data=ReferenceData(rows=[{"ID": 1}])),
+        ])
+        
+        order = self.agent._determine_generation_order(schema)
+        
+        self.assertEqual(order, ["Status", "Product", "Customer", "Order", "OrderLine"])
+    
+    def test_cycle_broken_at_one_table(self):
+        """Test that a cycle is broken at one of its tables and the rest stay ordered."""
+        schema = Schema(name="Test", tables=[
+            make_table("Shipment", "Invoice"),
+            make_table("Invoice", "Payment", "Approval"),
+            make_table("Refund", "Invoice"),
+            make_table("Approval", "Payment"),
+            make_table("Payment", "Invoice"),
+        ])
+        
+        order = self.agent._determine_generation_order(schema)
+        
+        # Payment waits on one table and Invoice on two, so the cycle is broken at
+        # Payment; Shipment only waits on the cycle and isn't picked to break it
+        self.assertEqual(order, ["Payment", "Approval", "Invoice", "Shipment", "Refund"])
+
+if __name__ == "__main__":
+    unittest.main()
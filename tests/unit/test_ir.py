@@ -252,6 +252,18 @@ def test_query_methods():
     assert email_column.name == "Email", "Column name doesn't match"
     assert email_column.data_type == ColumnType.NVARCHAR, "Column type doesn't match"
     print("✅ get_column works correctly")
+    
+    # Test that lookups follow changes made after the first lookup
+    schema.tables.append(Table(name="Orders", columns=[]))
+    assert schema.get_table("orders") is schema.tables[-1], "Appended table not found"
+    schema.tables[-1].name = "Invoices"
+    assert schema.get_table("Orders") is None, "Renamed table still found by old name"
+    assert schema.get_table("invoices") is schema.tables[-1], "Renamed table not found"
+    schema.tables[0] = Table(name="Customers", columns=[])
+    assert schema.get_table("Customers") is schema.tables[0], "Replaced table not found"
+    customers_table.columns[1] = Column(name="FirstName", data_type=ColumnType.NVARCHAR)
+    assert customers_table.get_column("FirstName") is customers_table.columns[1], "Replaced column not found"
+    print("✅ get_table follows schema changes")
 
 
 def main():
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the reference data agent.
+
+This module tests mapping a directory of reference data files onto a schema,
+including the fallback to name-based mapping when the LLM's mapping is unusable.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+from agents.ref_data_agent import RefDataAgent
+from models.ir import Column, ColumnType, Schema, Table
+
+
+class FakeProvider:
+    """LLM provider that returns a canned response and counts calls."""
+    
+    def __init__(self, response: str):
+        self.response = response
+        self.calls = 0
+    
+    def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return self.response
+
+
+class TestProcessDirectory(unittest.TestCase):
+    """Tests for RefDataAgent._process_directory."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.ref_dir = Path(self.temp_dir.name) / "ref_data"
+        self.ref_dir.mkdir()
+        self.schema = Schema(name="Test", tables=[
+            Table(name="Country", columns=[Column(name="CountryID", data_type=ColumnType.INTEGER)]),
+            Table(name="Currency", columns=[Column(name="CurrencyID", data_type=ColumnType.INTEGER)]),
+        ])
+    
+    def _write_ref_file(self, file_name: str, table_name: str, id_column: str) -> None:
+        (self.ref_dir / file_name).write_text(
+            f"# [dbo.{table_name}]\n{id_column}, Name\n1, First\n2, Second\n",
+            encoding="utf-8"
+        )
+    
+    def _process(self, response: str):
+        provider = FakeProvider(response)
+        with mock.patch("agents.ref_data_agent.get_provider", lambda name: provider):
+            agent = RefDataAgent(run_id="test", artifacts_dir=self.temp_dir.name)
+        schema = agent._process_directory(self.schema, self.ref_dir, intelligent_mapping=True)
+        return schema, provider.calls
+    
+    def test_bad_mapping_falls_back_to_simple_mapping(self):
+        """Test that a null schema table in the LLM mapping doesn't abort the run."""
+        self._write_ref_file("country.csv", "Countries", "CountryID")
+        self._write_ref_file("currency.csv", "Currency", "CurrencyID")
+        
+        schema, calls = self._process('{"mapping": {"dbo.Countries": null}}')
+        
+        # Only the file without a name match needs the LLM
+        self.assertEqual(calls, 1)
+        self.assertIsNone(schema.get_table("Country").reference_data)
+        self.assertEqual(len(schema.get_table("Currency").reference_data.rows), 2)
+    
+    def test_bad_batch_mapping_falls_back_to_simple_mapping(self):
+        """Test that a bad mapping in a batched answer only affects its own file."""
+        self._write_ref_file("country.csv", "Countries", "CountryID")
+        self._write_ref_file("currency.csv", "Currencies", "CurrencyID")
+        
+        schema, calls = self._process(
+            '{"mappings": {"country.csv": {"dbo.Countries": "Country"}, '
+            '"currency.csv": {"dbo.Currencies": null}}}'
+        )
+        
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(schema.get_table("Country").reference_data.rows), 2)
+        self.assertIsNone(schema.get_table("Currency").reference_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
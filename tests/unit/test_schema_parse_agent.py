@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the schema parse agent.
+
+This module tests the LLM parse path, including that only responses which
+convert to a schema are kept in the on-disk LLM cache, and the output token
+budgets that LLM calls are sized with.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+from agents.schema_parse_agent import SchemaParseAgent, _parse_token_budget
+
+SQL = "CREATE TABLE Customer (CustomerID INT NOT NULL PRIMARY KEY, Name NVARCHAR(50) NULL);"
+
+
+class FakeProvider:
+    """LLM provider that returns a canned JSON response."""
+    
+    def __init__(self, response):
+        self.response = response
+    
+    def generate_json(self, prompt, schema_template, **kwargs):
+        return self.response
+
+
+class TestParseWithLLM(unittest.TestCase):
+    """Tests for SchemaParseAgent._parse_with_llm."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+    
+    def _parse(self, response):
+        with mock.patch("agents.schema_parse_agent.get_provider", lambda name: FakeProvider(response)):
+            agent = SchemaParseAgent(run_id="test", artifacts_dir=self.temp_dir.name, seed=1)
+        # Retries after a failed conversion shouldn't slow the test down
+        with mock.patch("agents.base.time.sleep"):
+            return agent._parse_with_llm(SQL, "Test", 4000)
+    
+    def _cached_responses(self):
+        return list((Path(self.temp_dir.name) / "llm_cache").glob("*.json"))
+    
+    def test_converted_response_is_cached(self):
+        """Test that a response that converts to a schema is cached."""
+        schema = self._parse({
+            "name": "Test",
+            "tables": [{"name": "Customer", "columns": [{"name": "CustomerID", "data_type": "INT"}]}]
+        })
+        
+        self.assertEqual([table.name for table in schema.tables], ["Customer"])
+        self.assertEqual(len(self._cached_responses()), 1)
+    
+    def test_unconvertible_response_is_not_cached(self):
+        """Test that a response that can't be converted leaves nothing in the cache."""
+        schema = self._parse({"name": "Test", "tables": ["Customer"]})
+        
+        self.assertIsNone(schema)
+        self.assertEqual(self._cached_responses(), [])
+
+
+
+def wide_table_sql(name: str, column_count: int) -> str:
+    """Create a CREATE TABLE statement with many short column definitions."""
+    columns = ",\n".join(f"    C{i} INT NULL" for i in range(column_count))
+    return f"CREATE TABLE {name} (\n{columns},\n    CONSTRAINT PK_{name} PRIMARY KEY (C0)\n);"
+
+
+class TestTokenBudget(unittest.TestCase):
+    """Tests for the output token budget of parse calls."""
+    
+    def test_wide_table_budget(self):
+        """Test that the budget covers a JSON object per column of a wide table."""
+        budget = _parse_token_budget(wide_table_sql("Wide", 120))
+        
+        # 121 definitions at roughly 70 tokens of IR JSON each
+        self.assertGreaterEqual(budget, 121 * 70)
+        self.assertLess(budget, 121 * 100)
+    
+    def test_small_table_budget(self):
+        """Test that small statements get the minimum budget."""
+        self.assertEqual(_parse_token_budget("CREATE TABLE T (A INT)"), 512)
+    
+    def test_batches_fit_token_budget(self):
+        """Test that tables are batched so each call's response fits max_tokens."""
+        with mock.patch("agents.schema_parse_agent.get_provider", lambda name: None):
+            agent = SchemaParseAgent(run_id="test", artifacts_dir=tempfile.gettempdir())
+        tables_sql = [wide_table_sql(f"T{i}", 20) for i in range(4)]
+        
+        batches = agent._pack_table_batches(tables_sql, [0, 1, 2, 3], 100000, 4000)
+        
+        self.assertEqual(batches, [[0, 1], [2, 3]])
+        for batch in batches:
+            self.assertLessEqual(_parse_token_budget("\n\n".join(tables_sql[i] for i in batch)), 4000)
+
+
+if __name__ == "__main__":
+    unittest.main()
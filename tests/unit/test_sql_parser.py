@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQL DDL parser utility.
+
+This module tests statement splitting, deterministic parsing of CREATE TABLE
+statements into IR tables, and that unsupported DDL is rejected so callers can
+fall back to the LLM.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import unittest
+from utils.sql_parser import parse_create_table, split_statements, SQLParseError
+from models.ir import ColumnType
+
+
+class TestSplitStatements(unittest.TestCase):
+    """Tests for split_statements."""
+    
+    def test_ignores_separators_in_strings_and_comments(self):
+        """Test that semicolons in literals, identifiers and comments don't split."""
+        statements = split_statements(
+            "-- header; comment\n"
+            "/* block; comment */ CREATE TABLE A (x VARCHAR(5) DEFAULT 'a;b''c', [odd;name] INT);\n"
+            "ALTER TABLE A\n    ADD CONSTRAINT FK_A FOREIGN KEY (x) REFERENCES B (x);"
+        )
+        
+        self.assertEqual(statements, [
+            "CREATE TABLE A (x VARCHAR(5) DEFAULT 'a;b''c', [odd;name] INT);",
+            "ALTER TABLE A\n    ADD CONSTRAINT FK_A FOREIGN KEY (x) REFERENCES B (x);",
+        ])
+    
+    def test_go_batch_separator(self):
+        """Test that GO lines end statements without a semicolon."""
+        statements = split_statements("CREATE TABLE A (x INT)\nGO\nCREATE TABLE B (y INT)\ngo\n")
+        
+        self.assertEqual(statements, ["CREATE TABLE A (x INT)", "CREATE TABLE B (y INT)"])
+    
+    def test_unterminated_statement_before_create(self):
+        """Test that CREATE TABLE on a new line ends an unterminated statement."""
+        statements = split_statements("SET ANSI_NULLS ON\nCREATE TABLE dbo.A (x INT);")
+        
+        self.assertEqual(statements, ["SET ANSI_NULLS ON", "CREATE TABLE dbo.A (x INT);"])
+    
+    def test_consecutive_unterminated_creates(self):
+        """Test that consecutive unterminated CREATE and ALTER TABLE statements split."""
+        statements = split_statements(
+            "CREATE TABLE A (x INT)\n"
+            "CREATE TABLE B (\n    y INT\n)\n"
+            "  ALTER TABLE B ADD CONSTRAINT FK_B FOREIGN KEY (y) REFERENCES A (x)"
+        )
+        
+        self.assertEqual(statements, [
+            "CREATE TABLE A (x INT)",
+            "CREATE TABLE B (\n    y INT\n)",
+            "ALTER TABLE B ADD CONSTRAINT FK_B FOREIGN KEY (y) REFERENCES A (x)",
+        ])
+
+
+class TestParseCreateTable(unittest.TestCase):
+    """Tests for parse_create_table."""
+    
+    def test_columns_and_table_constraints(self):
+        """Test columns, types and named table-level constraints."""
+        table = parse_create_table("""CREATE TABLE [Order] (
+    OrderID INT IDENTITY(1,1) NOT NULL,
+    CustomerID INT NOT NULL,  -- Placed by
+    OrderDate DATETIME NOT NULL DEFAULT GETDATE(),
+    TotalAmount DECIMAL(12, 2) NOT NULL,
+    Status NVARCHAR(20) NOT NULL DEFAULT 'Pending',
+    Notes NVARCHAR(MAX) NULL,
+    CONSTRAINT PK_Order PRIMARY KEY (OrderID),
+    CONSTRAINT FK_Order_Customer FOREIGN KEY (CustomerID)
+        REFERENCES Customer (CustomerID) ON DELETE NO ACTION ON UPDATE CASCADE,
+    CONSTRAINT UQ_Order_Date UNIQUE (CustomerID, OrderDate),
+    CONSTRAINT CK_Order_Total CHECK (TotalAmount >= 0)
+);""")
+
+        self.assertEqual(table.name, "Order")
+        self.assertEqual([c.name for c in table.columns],
+                         ["OrderID", "CustomerID", "OrderDate", "TotalAmount", "Status", "Notes"])
+        
+        order_id = table.get_column("OrderID")
+        self.assertEqual(order_id.data_type, ColumnType.INTEGER)
+        self.assertTrue(order_id.is_identity)
+        self.assertFalse(order_id.nullable)
+        
+        self.assertEqual(table.get_column("CustomerID").description, "Placed by")
+        self.assertIsNone(table.get_column("OrderDate").description)
+        self.assertEqual(table.get_column("OrderDate").default_value, "GETDATE()")
+        self.assertEqual(table.get_column("Status").default_value, "'Pending'")
+        self.assertEqual(table.get_column("Status").length, 20)
+        self.assertIsNone(table.get_column("Notes").length)
+        self.assertTrue(table.get_column("Notes").nullable)
+        
+        amount = table.get_column("TotalAmount")
+        self.assertEqual((amount.precision, amount.scale), (12, 2))
+        
+        self.assertEqual(table.primary_key.name, "PK_Order")
+        self.assertEqual(table.primary_key.columns, ["OrderID"])
+        
+        fk = table.foreign_keys[0]
+        self.assertEqual((fk.name, fk.columns, fk.ref_table, fk.ref_columns),
+                         ("FK_Order_Customer", ["CustomerID"], "Customer", ["CustomerID"]))
+        self.assertEqual((fk.on_delete, fk.on_update), ("NO ACTION", "CASCADE"))
+        
+        self.assertEqual(table.unique_constraints[0].columns, ["CustomerID", "OrderDate"])
+        self.assertEqual(table.check_constraints[0].definition, "TotalAmount >= 0")
+    
+    def test_inline_constraints(self):
+        """Test unnamed constraints declared on the column."""
+        table = parse_create_table(
+            "CREATE TABLE dbo.Item (ItemID INT PRIMARY KEY, "
+            "CartID INT NOT NULL REFERENCES dbo.Cart(CartID) ON DELETE CASCADE, "
+            "Qty INT DEFAULT ((1)) CHECK (Qty > 0))"
+        )
+        
+        self.assertEqual(table.name, "Item")
+        self.assertEqual(table.primary_key.columns, ["ItemID"])
+        self.assertEqual(table.foreign_keys[0].ref_table, "Cart")
+        self.assertEqual(table.foreign_keys[0].on_delete, "CASCADE")
+        self.assertEqual(table.get_column("Qty").default_value, "1")
+        self.assertEqual(table.check_constraints[0].definition, "Qty > 0")
+    
+    def test_key_and_identity_columns_not_nullable(self):
+        """Test that primary key and identity columns are NOT NULL without saying so."""
+        inline = parse_create_table(
+            "CREATE TABLE A (AID INT PRIMARY KEY, Seq INT IDENTITY(1,1), Note NVARCHAR(10))"
+        )
+        table_level = parse_create_table(
+            "CREATE TABLE B (OrderID INT, LineNo INT, Qty INT NULL, "
+            "CONSTRAINT PK_B PRIMARY KEY ([orderid], LineNo))"
+        )
+        
+        self.assertEqual([c.nullable for c in inline.columns], [False, False, True])
+        self.assertEqual([c.nullable for c in table_level.columns], [False, False, True])
+    
+    def test_unsupported_ddl_raises(self):
+        """Test that DDL outside the supported subset is rejected."""
+        unsupported = [
+            "CREATE TABLE T (A INT, B AS (A * 2))",
+            "CREATE TABLE T (A dbo.CustomType NOT NULL)",
+            "CREATE TABLE T (A INT, INDEX IX_A (A))",
+            "CREATE TABLE T (A INT) WITH (DATA_COMPRESSION = PAGE)",
+            "ALTER TABLE T ADD CONSTRAINT PK_T PRIMARY KEY (A)",
+        ]
+        for sql in unsupported:
+            with self.subTest(sql=sql):
+                with self.assertRaises(SQLParseError):
+                    parse_create_table(sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,7 +9,7 @@ import json
 import os
 import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 # Import OpenAI package
 import openai
@@ -61,6 +61,30 @@ class LLMProvider:
         """
         raise NotImplementedError("Subclasses must implement this method")
     
+    def generate_stream(
+        self,
+        prompt: str,
+        temperature: float = 0.0,
+        max_tokens: int = 2000,
+        seed: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """Generate a response from the LLM as a stream of text chunks.
+        
+        Providers without streaming support yield the complete response at once.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            temperature: Control randomness (0.0 = deterministic, 1.0 = creative)
+            max_tokens: Maximum tokens in the response
+            seed: Seed for reproducibility (if supported)
+            **kwargs: Additional provider-specific parameters
+            
+        Yields:
+            Consecutive pieces of the text response
+        """
+        yield self.generate(prompt, temperature=temperature, max_tokens=max_tokens, seed=seed, **kwargs)
+    
     def generate_json(
         self,
         prompt: str,
@@ -189,6 +213,48 @@ class OpenAIProvider(LLMProvider):
         # Extract and return the text content
         return response.choices[0].message.content
     
+    def generate_stream(
+        self,
+        prompt: str,
+        temperature: float = 0.0,
+        max_tokens: int = 2000,
+        seed: Optional[int] = None,
+        model: str = "gpt-4o",
+        **kwargs
+    ) -> Iterator[str]:
+        """Generate a response using OpenAI's streaming API.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            temperature: Control randomness (0.0 = deterministic, 1.0 = creative)
+            max_tokens: Maximum tokens in the response
+            seed: Seed for reproducibility
+            model: OpenAI model to use
+            **kwargs: Additional parameters to pass to the API
+            
+        Yields:
+            Consecutive pieces of the text response as they are decoded
+        """
+        # Create the messages with system and user content
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant specialized in parsing SQL and generating structured data."},
+            {"role": "user", "content": prompt}
+        ]
+        
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            seed=seed,
+            stream=True,
+            **kwargs
+        )
+        
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     def generate_json(
         self,
         prompt: str,
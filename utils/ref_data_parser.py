@@ -285,8 +285,25 @@ def update_schema_with_reference_data(
     Returns:
         Updated Schema with reference data
     """
-    schemas_data = parse_multi_table_csv(ref_data_path)
+    return update_schema_with_reference_data_from_dict(
+        target_schema, parse_multi_table_csv(ref_data_path)
+    )
+
+
+def update_schema_with_reference_data_from_dict(
+    target_schema: Schema,
+    schemas_data: Dict[str, Dict[str, List[Dict[str, str]]]]
+) -> Schema:
+    """
+    Update an existing schema with already parsed multi-table reference data.
     
+    Args:
+        target_schema: Existing IR Schema to update
+        schemas_data: Reference data as returned by parse_multi_table_csv
+        
+    Returns:
+        Updated Schema with reference data
+    """
     # Find the schema in the parsed data that matches the target schema
     schema_name = target_schema.name
     
@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+SQL DDL Parser Utility
+
+This module provides a statement splitter for SQL Server scripts and a
+deterministic parser for CREATE TABLE statements that converts them directly to
+the Intermediate Representation (IR) without an LLM call. The parser covers the
+common DDL subset:
+
+- Columns with a type, optional length/precision/scale, NULL / NOT NULL,
+  IDENTITY and DEFAULT clauses
+- Inline and table-level PRIMARY KEY, FOREIGN KEY, UNIQUE and CHECK constraints,
+  named or unnamed
+- Trailing "-- comments" on a column line, used as the column description
+
+Anything outside that subset (computed columns, inline indexes, user-defined
+types, table options, ...) raises a SQLParseError so callers can fall back to
+LLM-based parsing.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from models.ir import (
+    Table, Column, ColumnType, PrimaryKey, ForeignKey,
+    CheckConstraint, UniqueConstraint
+)
+
+
+class SQLParseError(ValueError):
+    """Exception raised when a statement is outside the supported DDL subset."""
+    pass
+
+
+# Tokens of a column or constraint definition: bracketed identifiers, string
+# literals, words, numbers and single punctuation characters
+_TOKEN_RE = re.compile(
+    r"\s*(?:"
+    r"(?P<ident>\[[^\]]*\])"
+    r"|(?P<string>N?'(?:[^']|'')*')"
+    r"|(?P<word>[A-Za-z_@#][\w@#$]*)"
+    r"|(?P<number>\d+(?:\.\d+)?)"
+    r"|(?P<punct>\S)"
+    r")"
+)
+
+_CREATE_TABLE_RE = re.compile(r"\s*CREATE\s+TABLE\s+", re.IGNORECASE)
+
+# Places where statement splitting has to look closer: quotes, brackets,
+# comments, semicolons and line starts (for GO batch separators and new statements)
+_STATEMENT_TOKEN_RE = re.compile(r"'|\"|\[|;|--|/\*|\n")
+
+# A GO batch separator on its own line
+_GO_RE = re.compile(r"[ \t]*GO[ \t]*(?=\r?\n|\Z)", re.IGNORECASE)
+
+# A CREATE TABLE or ALTER TABLE at the start of a line, which begins a new statement
+# even when the previous one wasn't terminated
+_NEW_STATEMENT_RE = re.compile(r"[ \t]*(?:CREATE|ALTER)\s+TABLE\b", re.IGNORECASE)
+
+# Table options allowed after the closing parenthesis of CREATE TABLE
+_TABLE_SUFFIX_RE = re.compile(
+    r"(?:\s*(?:ON|TEXTIMAGE_ON)\s+(?:\[[^\]]*\]|\w+))*\s*;?(?:\s*--[^\n]*)*\s*\Z",
+    re.IGNORECASE
+)
+
+# Types whose single argument is a length
+_LENGTH_TYPES = frozenset({
+    ColumnType.CHAR, ColumnType.VARCHAR, ColumnType.NCHAR, ColumnType.NVARCHAR,
+    ColumnType.BINARY, ColumnType.VARBINARY,
+})
+
+# Referential actions of ON DELETE / ON UPDATE
+_REFERENTIAL_ACTIONS = {
+    ("NO", "ACTION"): "NO ACTION",
+    ("CASCADE",): "CASCADE",
+    ("SET", "NULL"): "SET NULL",
+    ("SET", "DEFAULT"): "SET DEFAULT",
+}
+
+# Keywords that start a column option rather than continue a DEFAULT expression
+_COLUMN_OPTION_KEYWORDS = frozenset({
+    "NULL", "NOT", "IDENTITY", "DEFAULT", "CONSTRAINT", "PRIMARY", "UNIQUE",
+    "REFERENCES", "FOREIGN", "CHECK", "COLLATE",
+})
+
+
+class _Token:
+    """A token of a definition, with its position in the definition text."""
+    
+    __slots__ = ("kind", "text", "start", "end")
+    
+    def __init__(self, kind: str, text: str, start: int, end: int):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+    
+    @property
+    def upper(self) -> str:
+        """Uppercase token text, for keyword comparisons."""
+        return self.text.upper()
+
+
+def _unquote(identifier: str) -> str:
+    """Strip SQL Server brackets or double quotes from an identifier."""
+    if len(identifier) >= 2 and identifier[0] in '["' and identifier[-1] in ']"':
+        return identifier[1:-1]
+    return identifier
+
+
+def _tokenize(text: str) -> List[_Token]:
+    """Split a definition into tokens."""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            break
+        kind = match.lastgroup
+        tokens.append(_Token(kind, match.group(kind), match.start(kind), match.end(kind)))
+        pos = match.end()
+    return tokens
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Split a SQL script into statements in a single pass.
+    
+    Statements end at a semicolon or a GO batch separator line outside string
+    literals, quoted identifiers and comments. A line starting with CREATE TABLE
+    or ALTER TABLE also ends an unterminated statement before it. Comments before
+    a statement are dropped; comments inside a statement are kept.
+    
+    Args:
+        sql: SQL script content
+        
+    Returns:
+        List of statements, each including its terminating semicolon if present
+    """
+    statements: List[str] = []
+    start: Optional[int] = None
+    pos = 0
+    n = len(sql)
+    
+    def end_statement(end: int) -> None:
+        if start is not None:
+            text = sql[start:end].strip()
+            if text:
+                statements.append(text)
+    
+    while pos < n:
+        match = _STATEMENT_TOKEN_RE.search(sql, pos)
+        stop = match.start() if match else n
+        if start is None:
+            # The statement starts at the first text that isn't whitespace or a comment
+            segment = sql[pos:stop]
+            leading = len(segment) - len(segment.lstrip())
+            if leading < len(segment):
+                start = pos + leading
+        if not match:
+            break
+        
+        token = match.group()
+        if token == "--":
+            end = sql.find("\n", stop)
+            pos = n if end == -1 else end
+        elif token == "/*":
+            end = sql.find("*/", stop + 2)
+            pos = n if end == -1 else end + 2
+        elif token == "\n":
+            pos = stop + 1
+            go = _GO_RE.match(sql, pos)
+            if go:
+                end_statement(stop)
+                start = None
+                pos = go.end()
+            elif start is not None and _NEW_STATEMENT_RE.match(sql, pos):
+                end_statement(stop)
+                start = None
+        elif token == ";":
+            end_statement(stop + 1)
+            start = None
+            pos = stop + 1
+        else:
+            # String literal or quoted identifier; a doubled closing character is an escape
+            if start is None:
+                start = stop
+            close = "]" if token == "[" else token
+            end = stop + 1
+            while True:
+                end = sql.find(close, end)
+                if end == -1:
+                    end = n
+                    break
+                if sql.startswith(close, end + 1):
+                    end += 2
+                    continue
+                break
+            pos = end + 1
+    
+    end_statement(n)
+    return statements
+
+
+def _split_body(body: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Split the body of a CREATE TABLE statement into its top-level definitions.
+    
+    Args:
+        body: Text between the outer parentheses of the statement
+    
+    Returns:
+        List of (definition, comment) tuples; the comment is a trailing comment on
+        the definition's line or a comment line just above it, and None when absent
+    """
+    items: List[Tuple[str, Optional[str]]] = []
+    current: List[str] = []
+    comment: Optional[str] = None
+    depth = 0
+    last_comma = 0
+    i = 0
+    n = len(body)
+    
+    def finish():
+        text = "".join(current).strip()
+        if text:
+            items.append((text, comment))
+    
+    while i < n:
+        ch = body[i]
+        if ch == "'":
+            end = i + 1
+            while end < n:
+                if body[end] == "'":
+                    if end + 1 < n and body[end + 1] == "'":
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(body[i:end + 1])
+            i = end + 1
+        elif ch == "[":
+            end = body.find("]", i)
+            end = n - 1 if end == -1 else end
+            current.append(body[i:end + 1])
+            i = end + 1
+        elif body.startswith("--", i):
+            end = body.find("\n", i)
+            end = n if end == -1 else end
+            text = body[i + 2:end].strip()
+            if text:
+                if "".join(current).strip() or "\n" in body[last_comma:i]:
+                    comment = text
+                elif items:
+                    # On the same line as the comma that ended the previous definition
+                    items[-1] = (items[-1][0], text)
+            i = end
+        elif body.startswith("/*", i):
+            end = body.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            current.append(" ")
+        elif ch == "(":
+            depth += 1
+            current.append(ch)
+            i += 1
+        elif ch == ")":
+            depth -= 1
+            current.append(ch)
+            i += 1
+        elif ch == "," and depth == 0:
+            finish()
+            current = []
+            comment = None
+            last_comma = i
+            i += 1
+        else:
+            current.append(ch)
+            i += 1
+    finish()
+    return items
+
+
+def _find_closing_paren(text: str, open_index: int) -> int:
+    """Find the parenthesis closing the one at open_index, skipping strings and comments."""
+    depth = 0
+    i = open_index
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "'":
+            i += 1
+            while i < n:
+                if text[i] == "'":
+                    if i + 1 < n and text[i + 1] == "'":
+                        i += 2
+                        continue
+                    break
+                i += 1
+        elif ch == "[":
+            end = text.find("]", i)
+            i = n if end == -1 else end
+        elif text.startswith("--", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 1
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise SQLParseError("Unbalanced parentheses in CREATE TABLE statement")
+
+
+class _Definition:
+    """Cursor over the tokens of a single column or constraint definition."""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+    
+    def at_end(self) -> bool:
+        return self.pos >= len(self.tokens)
+    
+    def peek(self, offset: int = 0) -> Optional[_Token]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+    
+    def peek_keyword(self, *keywords: str) -> bool:
+        """Check whether the next tokens are the given keywords."""
+        for offset, keyword in enumerate(keywords):
+            token = self.peek(offset)
+            if token is None or token.kind != "word" or token.upper != keyword:
+                return False
+        return True
+    
+    def accept(self, *keywords: str) -> bool:
+        """Consume the given keywords if they come next."""
+        if self.peek_keyword(*keywords):
+            self.pos += len(keywords)
+            return True
+        return False
+    
+    def expect(self, *keywords: str) -> None:
+        if not self.accept(*keywords):
+            raise SQLParseError(f"Expected {' '.join(keywords)} in: {self.text}")
+    
+    def identifier(self) -> str:
+        token = self.peek()
+        if token is None or token.kind not in ("word", "ident"):
+            raise SQLParseError(f"Expected an identifier in: {self.text}")
+        self.pos += 1
+        return _unquote(token.text)
+    
+    def qualified_name(self) -> str:
+        """Read a possibly schema-qualified name and return its last part."""
+        name = self.identifier()
+        while self.peek() is not None and self.peek().text == ".":
+            self.pos += 1
+            name = self.identifier()
+        return name
+    
+    def group(self) -> str:
+        """Consume a parenthesized group and return the text inside it."""
+        token = self.peek()
+        if token is None or token.text != "(":
+            raise SQLParseError(f"Expected '(' in: {self.text}")
+        depth = 0
+        for index in range(self.pos, len(self.tokens)):
+            text = self.tokens[index].text
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+                if depth == 0:
+                    inner = self.text[token.end:self.tokens[index].start]
+                    self.pos = index + 1
+                    return inner.strip()
+        raise SQLParseError(f"Unbalanced parentheses in: {self.text}")
+    
+    def column_list(self) -> List[str]:
+        """Consume a parenthesized column list, ignoring ASC/DESC."""
+        inner = _Definition(self.group())
+        columns = []
+        while not inner.at_end():
+            columns.append(inner.identifier())
+            inner.accept("ASC") or inner.accept("DESC")
+            if not inner.at_end():
+                token = inner.peek()
+                if token.text != ",":
+                    raise SQLParseError(f"Unexpected '{token.text}' in column list: {self.text}")
+                inner.pos += 1
+        if not columns:
+            raise SQLParseError(f"Empty column list in: {self.text}")
+        return columns
+    
+    def skip_index_options(self) -> None:
+        """Skip CLUSTERED/NONCLUSTERED before a key's column list."""
+        self.accept("CLUSTERED") or self.accept("NONCLUSTERED")
+    
+    def skip_key_suffix(self) -> None:
+        """Skip WITH (...) and ON <filegroup> after a key's column list."""
+        if self.accept("WITH"):
+            self.group()
+        if self.accept("ON"):
+            self.identifier()
+    
+    def referential_action(self) -> str:
+        for words, action in _REFERENTIAL_ACTIONS.items():
+            if self.accept(*words):
+                return action
+        raise SQLParseError(f"Unsupported referential action in: {self.text}")
+    
+    def default_expression(self) -> str:
+        """Consume a DEFAULT expression and return its text."""
+        start_token = self.peek()
+        if start_token is None:
+            raise SQLParseError(f"Missing DEFAULT value in: {self.text}")
+        
+        if start_token.text == "(":
+            expression = self.group()
+            # DEFAULT ((0)) is stored as 0, like DEFAULT 0
+            while expression.startswith("(") and _Definition(expression).group() == expression[1:-1].strip():
+                expression = expression[1:-1].strip()
+            return expression
+        
+        if start_token.kind == "word" and start_token.upper == "NULL":
+            self.pos += 1
+            return "NULL"
+        
+        start = start_token.start
+        if start_token.text in ("-", "+"):
+            self.pos += 1
+        token = self.peek()
+        if token is None or token.kind not in ("string", "number", "word"):
+            raise SQLParseError(f"Unsupported DEFAULT value in: {self.text}")
+        if token.kind == "word" and token.upper in _COLUMN_OPTION_KEYWORDS:
+            raise SQLParseError(f"Unsupported DEFAULT value in: {self.text}")
+        self.pos += 1
+        end = token.end
+        # Function calls such as GETDATE() or NEWID()
+        if token.kind == "word" and self.peek() is not None and self.peek().text == "(":
+            self.group()
+            end = self.tokens[self.pos - 1].end
+        return self.text[start:end]
+
+
+def _foreign_key(definition: _Definition, name: str, columns: List[str]) -> ForeignKey:
+    """Parse the REFERENCES clause of a foreign key."""
+    ref_table = definition.qualified_name()
+    ref_columns = definition.column_list()
+    if len(ref_columns) != len(columns):
+        raise SQLParseError(f"Foreign key column count mismatch in: {definition.text}")
+    on_delete = on_update = None
+    while definition.accept("ON"):
+        if definition.accept("DELETE"):
+            on_delete = definition.referential_action()
+        elif definition.accept("UPDATE"):
+            on_update = definition.referential_action()
+        else:
+            raise SQLParseError(f"Unsupported ON clause in: {definition.text}")
+    definition.accept("NOT", "FOR", "REPLICATION")
+    return ForeignKey(
+        name=name,
+        columns=columns,
+        ref_table=ref_table,
+        ref_columns=ref_columns,
+        on_delete=on_delete,
+        on_update=on_update
+    )
+
+
+def _table_constraint(table: Table, definition: _Definition) -> None:
+    """Parse a table-level constraint and add it to the table."""
+    name = definition.identifier() if definition.accept("CONSTRAINT") else None
+    
+    if definition.accept("PRIMARY", "KEY"):
+        if table.primary_key is not None:
+            raise SQLParseError(f"Multiple primary keys in table {table.name}")
+        definition.skip_index_options()
+        table.primary_key = PrimaryKey(name=name or f"PK_{table.name}", columns=definition.column_list())
+        definition.skip_key_suffix()
+    elif definition.accept("FOREIGN", "KEY"):
+        columns = definition.column_list()
+        definition.expect("REFERENCES")
+        fk_name = name or f"FK_{table.name}_{'_'.join(columns)}"
+        table.foreign_keys.append(_foreign_key(definition, fk_name, columns))
+    elif definition.accept("UNIQUE"):
+        definition.skip_index_options()
+        columns = definition.column_list()
+        table.unique_constraints.append(
+            UniqueConstraint(name=name or f"UQ_{table.name}_{'_'.join(columns)}", columns=columns)
+        )
+        definition.skip_key_suffix()
+    elif definition.accept("CHECK"):
+        definition.accept("NOT", "FOR", "REPLICATION")
+        table.check_constraints.append(CheckConstraint(
+            name=name or f"CK_{table.name}_{len(table.check_constraints) + 1}",
+            definition=definition.group()
+        ))
+    else:
+        raise SQLParseError(f"Unsupported table constraint: {definition.text}")
+    
+    if not definition.at_end():
+        raise SQLParseError(f"Unexpected text after constraint: {definition.text}")
+
+
+def _column(table: Table, definition: _Definition, description: Optional[str]) -> Column:
+    """Parse a column definition, adding any inline constraints to the table."""
+    name = definition.identifier()
+    if definition.peek_keyword("AS"):
+        raise SQLParseError(f"Computed column {name} is not supported")
+    
+    type_name = definition.identifier()
+    data_type = ColumnType.from_sql_type(type_name)
+    if data_type == ColumnType.UNKNOWN:
+        raise SQLParseError(f"Unsupported data type {type_name} for column {name}")
+    
+    length = precision = scale = None
+    token = definition.peek()
+    if token is not None and token.text == "(":
+        args = [arg.strip().upper() for arg in definition.group().split(",")]
+        if data_type in _LENGTH_TYPES and len(args) == 1:
+            length = None if args[0] == "MAX" else int(args[0])
+        elif data_type in (ColumnType.DECIMAL, ColumnType.NUMERIC) and len(args) in (1, 2):
+            precision = int(args[0])
+            scale = int(args[1]) if len(args) == 2 else 0
+        elif len(args) == 1 and args[0].isdigit():
+            # FLOAT(n), DATETIME2(n), TIME(n), DATETIMEOFFSET(n)
+            precision = int(args[0])
+        else:
+            raise SQLParseError(f"Unsupported type arguments for column {name}: {type_name}({', '.join(args)})")
+    
+    column = Column(
+        name=name,
+        data_type=data_type,
+        length=length,
+        precision=precision,
+        scale=scale,
+        description=description
+    )
+    
+    while not definition.at_end():
+        constraint_name = definition.identifier() if definition.accept("CONSTRAINT") else None
+        if definition.accept("NOT", "NULL"):
+            column.nullable = False
+        elif definition.accept("NULL"):
+            column.nullable = True
+        elif definition.accept("IDENTITY"):
+            column.is_identity = True
+            token = definition.peek()
+            if token is not None and token.text == "(":
+                definition.group()
+        elif definition.accept("DEFAULT"):
+            column.default_value = definition.default_expression()
+        elif definition.accept("PRIMARY", "KEY"):
+            if table.primary_key is not None:
+                raise SQLParseError(f"Multiple primary keys in table {table.name}")
+            definition.skip_index_options()
+            table.primary_key = PrimaryKey(name=constraint_name or f"PK_{table.name}", columns=[name])
+            definition.skip_key_suffix()
+        elif definition.accept("UNIQUE"):
+            definition.skip_index_options()
+            table.unique_constraints.append(
+                UniqueConstraint(name=constraint_name or f"UQ_{table.name}_{name}", columns=[name])
+            )
+            definition.skip_key_suffix()
+        elif definition.accept("FOREIGN", "KEY") or definition.peek_keyword("REFERENCES"):
+            definition.expect("REFERENCES")
+            fk_name = constraint_name or f"FK_{table.name}_{name}"
+            table.foreign_keys.append(_foreign_key(definition, fk_name, [name]))
+        elif definition.accept("CHECK"):
+            table.check_constraints.append(CheckConstraint(
+                name=constraint_name or f"CK_{table.name}_{name}",
+                definition=definition.group()
+            ))
+        elif definition.accept("COLLATE"):
+            definition.identifier()
+        else:
+            token = definition.peek()
+            raise SQLParseError(f"Unsupported column option '{token.text}' for column {name}")
+    
+    return column
+
+
+def parse_create_table(sql: str) -> Table:
+    """
+    Parse a single SQL Server CREATE TABLE statement into an IR Table.
+    
+    Args:
+        sql: The CREATE TABLE statement, optionally ending with a semicolon
+    
+    Returns:
+        Table object; descriptions come from trailing column comments
+    
+    Raises:
+        SQLParseError: If the statement uses DDL outside the supported subset
+    """
+    match = _CREATE_TABLE_RE.match(sql)
+    if not match:
+        raise SQLParseError("Not a CREATE TABLE statement")
+    
+    open_index = sql.find("(", match.end())
+    if open_index == -1:
+        raise SQLParseError("CREATE TABLE statement has no column list")
+    name_part = _Definition(sql[match.end():open_index])
+    table_name = name_part.qualified_name()
+    if not name_part.at_end():
+        raise SQLParseError(f"Unsupported table name: {sql[match.end():open_index].strip()}")
+    
+    close_index = _find_closing_paren(sql, open_index)
+    if not _TABLE_SUFFIX_RE.match(sql, close_index + 1):
+        raise SQLParseError(f"Unsupported text after the column list of table {table_name}")
+    
+    table = Table(name=table_name, columns=[])
+    for text, comment in _split_body(sql[open_index + 1:close_index]):
+        definition = _Definition(text)
+        if definition.peek_keyword("CONSTRAINT") or any(
+            definition.peek_keyword(*keywords)
+            for keywords in (("PRIMARY", "KEY"), ("FOREIGN", "KEY"), ("UNIQUE",), ("CHECK",))
+        ):
+            _table_constraint(table, definition)
+        elif definition.peek_keyword("INDEX") or definition.peek_keyword("PERIOD"):
+            raise SQLParseError(f"Unsupported table element: {text}")
+        else:
+            table.columns.append(_column(table, definition, comment))
+    
+    if not table.columns:
+        raise SQLParseError(f"Table {table_name} has no columns")
+    
+    # SQL Server makes primary key and identity columns NOT NULL even when the
+    # column definition doesn't say so
+    key_columns = {name.lower() for name in table.primary_key.columns} if table.primary_key else set()
+    for column in table.columns:
+        if column.is_identity or column.name.lower() in key_columns:
+            column.nullable = False
+    return table